@@ -0,0 +1,283 @@
+# Olympic Reserve - Аналитика по таблицам реестра
+# Векторизованные вычисления pandas/NumPy без циклов по спортсменам:
+# все спортсмены обрабатываются за один проход groupby.
+# Не зависит от Streamlit: кэширование выполняется в app.py.
+
+import numpy as np
+import pandas as pd
+
+# ===== ФУНКЦИОНАЛЬНЫЕ ТЕСТЫ =====
+
+# Показатель -> (подпись, больше = лучше)
+TEST_METRICS = {
+    'vo2_max_ml_kg_min': ('VO₂max (мл·кг⁻¹·мин⁻¹)', True),
+    'anaerobic_threshold_percent': ('Анаэробный порог (%)', True),
+    'peak_power_watts': ('Пиковая мощность (Вт)', True),
+    'performance_time_seconds': ('Время выполнения (с)', False),
+}
+
+AGE_BINS = [0, 15, 17, 19, 200]
+AGE_LABELS = ['до 15', '16–17', '18–19', '20+']
+
+COHORT_COLUMNS = ['sport', 'gender', 'age_group']
+
+def age_groups(ages):
+    """Возрастные группы для когорт (вид спорта × пол × возраст)"""
+    return pd.cut(ages, bins=AGE_BINS, labels=AGE_LABELS)
+
+def test_trends(df_tests, metric, window=3):
+    """Динамика показателя по каждому тесту.
+
+    Добавляет к строкам тестов скользящее среднее по последним window тестам
+    спортсмена и личный рекорд на дату теста (накопленный максимум/минимум).
+    """
+    higher_is_better = TEST_METRICS[metric][1]
+    df = (df_tests[['athlete_id', 'test_date', metric]]
+          .dropna(subset=[metric])
+          .sort_values(['athlete_id', 'test_date'], kind='stable')
+          .reset_index(drop=True))
+    df['test_date'] = pd.to_datetime(df['test_date'])
+    values = df[metric].astype('float64')
+    groups = values.groupby(df['athlete_id'], sort=False, observed=True)
+
+    df['rolling_mean'] = (groups.rolling(window, min_periods=1).mean()
+                          .reset_index(level=0, drop=True))
+    df['personal_best'] = groups.cummax() if higher_is_better else groups.cummin()
+    return df
+
+def improvement_ranking(df_tests, df_athletes, metric, window=3):
+    """Темп прогресса каждого спортсмена и его процентиль в когорте.
+
+    Наклон считается методом наименьших квадратов по всем тестам спортсмена
+    (единица показателя за 30 дней) через групповые суммы центрированных
+    значений - один проход по таблице для всех спортсменов. Для показателей,
+    где меньше = лучше, прогресс = -наклон.
+    """
+    higher_is_better = TEST_METRICS[metric][1]
+    trends = test_trends(df_tests, metric, window)
+    if trends.empty:
+        return pd.DataFrame()
+
+    days = (trends['test_date'] - trends['test_date'].min()).dt.days.astype('float64')
+    values = trends[metric].astype('float64')
+    key = trends['athlete_id']
+
+    x = days - days.groupby(key, observed=True).transform('mean')
+    y = values - values.groupby(key, observed=True).transform('mean')
+    sums = pd.DataFrame({'xy': x * y, 'xx': x * x, 'athlete_id': key}) \
+        .groupby('athlete_id', observed=True).sum()
+    slope = (sums['xy'] / sums['xx'].replace(0, np.nan)) * 30
+
+    grouped = trends.groupby('athlete_id', observed=True)
+    summary = pd.DataFrame({
+        'tests': grouped.size(),
+        'first_date': grouped['test_date'].first(),
+        'last_date': grouped['test_date'].last(),
+        'first_value': grouped[metric].first().astype('float64'),
+        'last_value': grouped[metric].last().astype('float64'),
+        'rolling_mean': grouped['rolling_mean'].last(),
+        'personal_best': grouped['personal_best'].last(),
+        'slope_per_30d': slope,
+    })
+    summary['improvement_per_30d'] = summary['slope_per_30d'] * (1 if higher_is_better else -1)
+
+    athletes = df_athletes[['athlete_id', 'full_name', 'sport', 'gender', 'age']].copy()
+    athletes['athlete_id'] = athletes['athlete_id'].astype(str)
+    athletes['age_group'] = age_groups(athletes['age'])
+    summary.index = summary.index.astype(str)
+    summary = summary.join(athletes.set_index('athlete_id'), how='inner').reset_index(
+        names='athlete_id')
+
+    cohorts = summary.groupby(COHORT_COLUMNS, observed=True, dropna=False)
+    summary['improvement_percentile'] = cohorts['improvement_per_30d'].rank(pct=True) * 100
+    summary['best_percentile'] = cohorts['personal_best'].rank(
+        pct=True, ascending=higher_is_better) * 100
+    summary['cohort_size'] = cohorts['athlete_id'].transform('size')
+
+    return summary.sort_values('improvement_per_30d', ascending=False,
+                               na_position='last').reset_index(drop=True)
+
+# ===== СРАВНЕНИЕ С КОГОРТОЙ =====
+
+# Показатель профиля -> (подпись, источник строки, больше = лучше).
+# Источники: карточка спортсмена, последний осмотр, последняя оценка психолога
+# (столбцы queries.cohort_metrics).
+PROFILE_METRICS = {
+    'vo2_max_ml_kg_min': ('VO₂max', 'athlete', True),
+    'resting_heart_rate_bpm': ('ЧСС покоя', 'athlete', False),
+    'heart_rate_peak_bpm': ('Макс. ЧСС', 'athlete', True),
+    'body_fat_percent': ('Жировая ткань', 'athlete', False),
+    'muscle_mass_percent': ('Мышечная масса', 'athlete', True),
+    'hemoglobin_g_dl': ('Гемоглобин', 'medical', True),
+    'vo2_peak_ml_kg_min': ('VO₂peak', 'medical', True),
+    'motivation_level_1_10': ('Мотивация', 'psych', True),
+    'stress_resilience_1_10': ('Стрессоустойчивость', 'psych', True),
+    'overall_psychological_score_1_100': ('Психологический балл', 'psych', True),
+}
+
+def cohort_key(sport, gender, age):
+    """Ключ когорты (вид спорта, пол, возрастная группа) - как в age_groups"""
+    if age is None or pd.isna(age):
+        return (sport, gender, None)
+    index = int(np.searchsorted(AGE_BINS, age, side='left')) - 1
+    group = AGE_LABELS[index] if 0 <= index < len(AGE_LABELS) else None
+    return (sport, gender, group)
+
+class CohortIndex:
+    """Отсортированные значения показателей по когортам.
+
+    Строится один раз на версию данных; процентиль спортсмена - два
+    бинарных поиска (np.searchsorted) в массиве его когорты, без
+    повторного просмотра таблиц.
+    """
+
+    def __init__(self, df, metrics=PROFILE_METRICS):
+        self.metrics = metrics
+        self.arrays = {}
+        df = df.copy()
+        df['age_group'] = age_groups(df['age']).astype(str)
+        for key, group in df.groupby(COHORT_COLUMNS, observed=True, sort=False):
+            self.arrays[key] = {}
+            for metric in metrics:
+                values = group[metric].to_numpy(dtype='float64')
+                self.arrays[key][metric] = np.sort(values[~np.isnan(values)])
+
+    def cohort_size(self, key):
+        arrays = self.arrays.get(key)
+        return 0 if not arrays else max(len(values) for values in arrays.values())
+
+    def percentile(self, key, metric, value):
+        """Процентиль значения в когорте (0-100, 100 = лучший) и размер выборки.
+
+        Совпадающие значения получают средний ранг. Для показателей, где
+        меньше = лучше, шкала переворачивается. (None, n), если сравнивать не с чем.
+        """
+        values = self.arrays.get(key, {}).get(metric)
+        if values is None or len(values) == 0 or value is None or pd.isna(value):
+            return None, 0 if values is None else len(values)
+        below = np.searchsorted(values, value, side='left')
+        equal = np.searchsorted(values, value, side='right') - below
+        percentile = (below + 0.5 * equal) / len(values) * 100
+        if not self.metrics[metric][2]:
+            percentile = 100 - percentile
+        return float(percentile), len(values)
+
+    def profile(self, athlete, medical=None, psych=None):
+        """Процентили всех показателей спортсмена в его когорте (DataFrame)"""
+        key = cohort_key(athlete['sport'], athlete['gender'], athlete['age'])
+        rows = {'athlete': athlete, 'medical': medical or {}, 'psych': psych or {}}
+        result = []
+        for metric, (label, source, _) in self.metrics.items():
+            value = rows[source].get(metric)
+            percentile, size = self.percentile(key, metric, value)
+            result.append({'metric': label, 'value': value,
+                           'percentile': percentile, 'cohort_size': size})
+        return pd.DataFrame(result)
+
+# ===== ТРЕНИРОВОЧНЫЕ СБОРЫ =====
+
+CANCELLED_STATUS = 'Отменен'
+
+def camp_intervals(df_camps, include_cancelled=False):
+    """Интервалы сборов [start, end] (включительно, с точностью до дня).
+
+    end_date в выгрузках не всегда согласован с duration_days, поэтому
+    конец интервала считается как start_date + duration_days - 1, а end_date
+    используется, только если длительность не указана.
+    """
+    df = df_camps.copy()
+    if not include_cancelled and 'participation_status' in df:
+        df = df[df['participation_status'] != CANCELLED_STATUS]
+    df['start'] = pd.to_datetime(df['start_date']).dt.normalize()
+    days = pd.to_timedelta(df['duration_days'].astype('float64') - 1, unit='D')
+    df['end'] = (df['start'] + days).fillna(pd.to_datetime(df['end_date']).dt.normalize())
+    df = df.dropna(subset=['start', 'end'])
+    df = df[df['end'] >= df['start']]
+    return df.reset_index(drop=True)
+
+def camp_overlaps(df_camps):
+    """Пересекающиеся сборы одного спортсмена (сортировка + проход, O(n log n)).
+
+    После сортировки по (athlete_id, start) сбор пересекается с предыдущими,
+    если начинается не позже максимального конца предыдущих сборов
+    спортсмена (накопленный максимум). Цепочки пересечений получают общий
+    номер overlap_group; возвращаются только группы из двух и более сборов.
+    """
+    df = camp_intervals(df_camps).sort_values(['athlete_id', 'start', 'end'], kind='stable')
+    if df.empty:
+        return df.assign(overlap_group=pd.Series(dtype='int64'), group_size=pd.Series(dtype='int64'))
+
+    end_ns = df['end'].astype('int64')
+    prev_end = end_ns.groupby(df['athlete_id'], observed=True).cummax() \
+        .groupby(df['athlete_id'], observed=True).shift()
+    new_group = prev_end.isna() | (df['start'].astype('int64') > prev_end)
+    df['overlap_group'] = new_group.cumsum()
+    df['group_size'] = df.groupby('overlap_group')['camp_id'].transform('size')
+    return df[df['group_size'] > 1].reset_index(drop=True)
+
+def weekly_training_hours(df_camps):
+    """Тренировочные часы по неделям: по спортсмену и нарастающим итогом.
+
+    Каждый сбор разворачивается в дни (np.repeat, линейно по числу
+    сбор-дней), дневные часы суммируются по неделям (понедельник).
+    """
+    df = camp_intervals(df_camps)
+    columns = ['athlete_id', 'week', 'hours', 'cumulative_hours']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    lengths = ((df['end'] - df['start']).dt.days + 1).to_numpy()
+    rows = np.repeat(np.arange(len(df)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = df['start'].to_numpy()[rows] + offsets.astype('timedelta64[D]')
+
+    daily = pd.DataFrame({
+        'athlete_id': df['athlete_id'].to_numpy()[rows],
+        'week': pd.DatetimeIndex(days).to_period('W-SUN').start_time,
+        'hours': df['average_daily_training_hours'].astype('float64').to_numpy()[rows],
+    })
+    weekly = daily.groupby(['athlete_id', 'week'], observed=True, sort=True)['hours'] \
+        .sum().reset_index()
+    weekly['cumulative_hours'] = weekly.groupby('athlete_id', observed=True)['hours'].cumsum()
+    return weekly[columns]
+
+def location_occupancy(df_camps):
+    """Число спортсменов на каждой базе во времени (проход по событиям +1/-1).
+
+    Начало сбора дает +1 в день start, окончание -1 в день end + 1;
+    накопленная сумма по отсортированным событиям базы - загрузка с этой даты.
+    """
+    df = camp_intervals(df_camps)
+    columns = ['location', 'date', 'athletes']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    events = pd.DataFrame({
+        'location': np.concatenate([df['location'].to_numpy(), df['location'].to_numpy()]),
+        'date': np.concatenate([df['start'].to_numpy(),
+                                (df['end'] + pd.Timedelta(days=1)).to_numpy()]),
+        'delta': np.concatenate([np.ones(len(df), 'int64'), -np.ones(len(df), 'int64')]),
+    })
+    events = events.groupby(['location', 'date'], sort=True)['delta'].sum().reset_index()
+    events['athletes'] = events.groupby('location')['delta'].cumsum()
+    return events[columns]
+
+def location_capacity(df_camps):
+    """Пиковая загрузка баз: максимум одновременно находящихся спортсменов"""
+    occupancy = location_occupancy(df_camps)
+    df = camp_intervals(df_camps)
+    if occupancy.empty:
+        return pd.DataFrame(columns=['location', 'camps', 'athletes', 'peak_athletes',
+                                     'peak_date', 'camp_days'])
+
+    peaks = occupancy.loc[occupancy.groupby('location')['athletes'].idxmax()]
+    summary = df.groupby('location', observed=True).agg(
+        camps=('camp_id', 'size'),
+        athletes=('athlete_id', 'nunique'),
+        camp_days=('duration_days', 'sum'),
+    )
+    summary = summary.join(peaks.set_index('location')
+                           .rename(columns={'athletes': 'peak_athletes', 'date': 'peak_date'}))
+    return summary.reset_index().sort_values('peak_athletes', ascending=False) \
+        .reset_index(drop=True)[['location', 'camps', 'athletes', 'peak_athletes',
+                                 'peak_date', 'camp_days']]
@@ -0,0 +1,368 @@
+# Olympic Reserve - HTTP API только для чтения (JSON)
+# Отдельная точка входа для внешних систем (порталы федераций, ETL):
+# те же запросы queries.py и то же ограничение по виду спорта, что в
+# дашборде, но без перезапусков скрипта Streamlit.
+# Запуск из командной строки:
+#   python api.py --port 8080
+#   curl -u admin:admin123 'http://localhost:8080/athletes?limit=20&sport=Гребля'
+# Асинхронный сервер на стандартной библиотеке (asyncio); запросы к SQLite
+# выполняются в пуле потоков, поэтому медленный клиент не блокирует остальных.
+
+import argparse
+import asyncio
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import auth
+import db
+import instrumentation
+import migrations
+import queries
+
+HOST = '127.0.0.1'
+PORT = 8080
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+GZIP_MIN_BYTES = 1024      # меньшие ответы не сжимаются
+GZIP_LEVEL = 5
+KEEPALIVE_TIMEOUT = 15     # секунд ожидания следующего запроса в соединении
+MAX_HEADER_BYTES = 16384
+MAX_BODY_BYTES = 65536     # API только читает: больше тело запроса не принимается
+REALM = 'Olympic Reserve API'
+
+logger = logging.getLogger(__name__)
+
+class ApiError(Exception):
+    """Ошибка запроса с HTTP-статусом"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ===== ОБРАБОТЧИКИ =====
+# Каждый обработчик выполняется в пуле потоков и получает вид спорта
+# пользователя (None - администратор) и параметры строки запроса.
+
+def _frame(df):
+    """DataFrame -> список словарей для JSON (NaN -> null, даты в ISO)"""
+    return json.loads(df.to_json(orient='records', force_ascii=False, date_format='iso'))
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+def _int_param(params, name, default, minimum=0, maximum=None):
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f'{name}: ожидалось целое число')
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f'{name}: допустимо от {minimum} до {maximum}')
+    return value
+
+def _page(params):
+    return (_int_param(params, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT),
+            _int_param(params, 'offset', 0))
+
+def _scope(sport, params):
+    """Вид спорта запроса: куратор ограничен своим, администратор может задать ?sport="""
+    requested = _param(params, 'sport')
+    if sport is None:
+        return requested
+    if requested is not None and requested != sport:
+        raise ApiError(HTTPStatus.FORBIDDEN, 'Нет доступа к другому виду спорта')
+    return sport
+
+def _visible_athlete(sport, athlete_id):
+    athlete = queries.get_athlete(athlete_id)
+    if athlete is None or (sport is not None and athlete['sport'] != sport):
+        raise ApiError(HTTPStatus.NOT_FOUND, 'Спортсмен не найден')
+    return athlete
+
+def list_athletes(sport, params):
+    """Спортсмены: поиск, фильтры и сортировка как в таблице дашборда"""
+    spec = queries.PAGED_QUERIES['athletes']
+    sport = _scope(sport, params)
+    limit, offset = _page(params)
+    search = _param(params, 'search', '')
+    filters = {column: _param(params, column) for column in spec['filters']
+               if column != 'sport' and _param(params, column) is not None}
+    sort_by = _param(params, 'sort', spec['columns'][0])
+    descending = _param(params, 'desc', '0') in ('1', 'true')
+    try:
+        total = queries.paged_count('athletes', sport, search, filters)
+        rows = queries.paged_rows('athletes', sport, search, filters, sort_by,
+                                  descending, limit, offset)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+    return {'total': total, 'limit': limit, 'offset': offset, 'items': _frame(rows)}
+
+def get_athlete(sport, params, athlete_id):
+    """Карточка спортсмена с последним осмотром и оценкой психолога"""
+    return {
+        'athlete': _visible_athlete(sport, athlete_id),
+        'latest_medical_exam': queries.latest_medical_exam(athlete_id),
+        'latest_psych_assessment': queries.latest_psych_assessment(athlete_id),
+    }
+
+def athlete_tests(sport, params, athlete_id):
+    """История функциональных тестов спортсмена"""
+    _visible_athlete(sport, athlete_id)
+    return {'items': _frame(queries.test_history(athlete_id))}
+
+def list_table(sport, params, table):
+    """Страница строк любой таблицы реестра в порядке первичного ключа"""
+    if table not in db.TABLES:
+        raise ApiError(HTTPStatus.NOT_FOUND, f'Неизвестная таблица: {table}')
+    sport = _scope(sport, params)
+    limit, offset = _page(params)
+    return {'total': queries.scoped_count(table, sport), 'limit': limit, 'offset': offset,
+            'items': _frame(queries.scoped_rows(table, sport, limit, offset))}
+
+def athlete_summary(sport, params):
+    return {'items': _frame(queries.athlete_summary(_scope(sport, params)))}
+
+def finance_summary(sport, params):
+    return {'items': _frame(queries.finance_summary(_scope(sport, params)))}
+
+# (шаблон пути, обработчик, таблицы для ETag или None - таблица из пути;
+# строки дочерней таблицы выбираются по athletes.sport, поэтому ее ETag
+# зависит и от версии athletes)
+ROUTES = [
+    (r'/athletes', list_athletes, ('athletes',)),
+    (r'/athletes/(?P<athlete_id>[^/]+)', get_athlete,
+     ('athletes', 'medical_records', 'psychological_records')),
+    (r'/athletes/(?P<athlete_id>[^/]+)/tests', athlete_tests, ('athletes', 'functional_tests')),
+    (r'/tables/(?P<table>\w+)', list_table, None),
+    (r'/summary/athletes', athlete_summary, ('athletes',)),
+    (r'/summary/finance', finance_summary, ('financial_records', 'athletes')),
+]
+ROUTES = [(re.compile(f'^{pattern}$'), handler, tables) for pattern, handler, tables in ROUTES]
+
+# ===== HTTP =====
+
+class Response:
+    def __init__(self, status, body=b'', content_type='application/json; charset=utf-8',
+                 headers=None):
+        self.status = HTTPStatus(status)
+        self.body = body
+        self.headers = {'Content-Type': content_type, **(headers or {})}
+
+def _json_response(status, payload, headers=None):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    return Response(status, body, headers=headers)
+
+def _error(status, message, headers=None):
+    return _json_response(status, {'error': message}, headers)
+
+def _user(headers):
+    """Пользователь из заголовка Authorization: Basic ... или None"""
+    value = headers.get('authorization', '')
+    scheme, _, credentials = value.partition(' ')
+    if scheme.lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(credentials).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return auth.authenticate(username, password)
+
+def _etag(path, query, sport, versions):
+    """ETag ответа: путь, параметры, вид спорта пользователя и версии таблиц"""
+    key = json.dumps([path, sorted(query.items()), sport, versions], ensure_ascii=False)
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    # Сжатый ответ имеет ETag с суффиксом -gzip (см. ApiServer._encode)
+    tags = [tag.strip().removeprefix('W/').replace('-gzip"', '"') for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+class ApiServer:
+    """Маршрутизация, авторизация, ETag и сжатие поверх asyncio.start_server"""
+
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or db.POOL_SIZE,
+                                           thread_name_prefix='api')
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def handle(self, method, target, headers):
+        """Обработать запрос (без сети): метод, путь с параметрами, заголовки (нижний регистр)"""
+        if method not in ('GET', 'HEAD'):
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED, 'Только GET', {'Allow': 'GET, HEAD'})
+
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip('/') or '/'
+        params = parse_qs(url.query)
+
+        if path == '/health':
+            return _json_response(HTTPStatus.OK, {'status': 'ok'})
+
+        user = _user(headers)
+        if user is None:
+            return _error(HTTPStatus.UNAUTHORIZED, 'Требуется авторизация',
+                          {'WWW-Authenticate': f'Basic realm="{REALM}", charset="UTF-8"'})
+        sport = user['sport'] if user['role'] == 'curator' else None
+
+        if path == '/metrics':
+            if user['role'] != 'admin':
+                return _error(HTTPStatus.FORBIDDEN, 'Только для администратора')
+            return Response(HTTPStatus.OK, instrumentation.to_prometheus().encode('utf-8'),
+                            'text/plain; version=0.0.4; charset=utf-8')
+
+        for pattern, handler, tables in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return _error(HTTPStatus.NOT_FOUND, 'Неизвестный путь')
+
+        kwargs = match.groupdict()
+        if tables is None:
+            table = kwargs.get('table')
+            tables = (table,) if table in queries.SPORT_TABLES else (table, 'athletes')
+        with instrumentation.timer(f'api:{handler.__name__}', 'api') as call:
+            # Условный запрос проверяется до выполнения запроса к данным
+            versions = await self._run(queries.table_versions)
+            etag = _etag(path, params, sport, [versions.get(t, 0) for t in tables])
+            cache_headers = {'ETag': etag, 'Cache-Control': 'private, no-cache',
+                             'Vary': 'Authorization, Accept-Encoding'}
+            if _etag_matches(headers.get('if-none-match'), etag):
+                return Response(HTTPStatus.NOT_MODIFIED, headers=cache_headers)
+            try:
+                payload = await self._run(lambda: handler(sport, params, **kwargs))
+            except ApiError as e:
+                return _error(e.status, e.message)
+            call.set_result(payload.get('items'))
+            return _json_response(HTTPStatus.OK, payload, cache_headers)
+
+    async def _encode(self, response, headers):
+        """Сжать тело gzip, если клиент поддерживает и ответ достаточно большой"""
+        accepted = headers.get('accept-encoding', '')
+        if (len(response.body) >= GZIP_MIN_BYTES
+                and any(e.strip().split(';')[0] == 'gzip' for e in accepted.split(','))):
+            response.body = await self._run(gzip.compress, response.body, GZIP_LEVEL)
+            response.headers['Content-Encoding'] = 'gzip'
+            if 'ETag' in response.headers:
+                # Сжатое представление - другой ETag (RFC 9110, 8.8.3)
+                response.headers['ETag'] = response.headers['ETag'][:-1] + '-gzip"'
+        return response
+
+    async def _read_request(self, reader):
+        """(метод, путь, версия, заголовки) или None при закрытии соединения"""
+        try:
+            raw = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'Слишком большие заголовки')
+        lines = raw.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Неверная строка запроса')
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        # Тело запроса (если есть) пропускается: API только читает
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Неверный заголовок Content-Length')
+        if length > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Слишком большое тело запроса')
+        if length:
+            await asyncio.wait_for(reader.readexactly(length), KEEPALIVE_TIMEOUT)
+        return method, target, version, headers
+
+    async def _write(self, writer, method, response, keep_alive):
+        body = b'' if response.status == HTTPStatus.NOT_MODIFIED else response.body
+        response.headers['Content-Length'] = str(len(body))
+        response.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        head = [f'HTTP/1.1 {response.status.value} {response.status.phrase}']
+        head += [f'{name}: {value}' for name, value in response.headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('utf-8'))
+        if method != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+    async def _client(self, reader, writer):
+        """Соединение клиента: запросы обрабатываются по очереди (keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ApiError as e:
+                    await self._write(writer, 'GET', _error(e.status, e.message), False)
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' \
+                    else connection == 'keep-alive'
+                try:
+                    response = await self.handle(method, target, headers)
+                except Exception:
+                    logger.exception('Ошибка обработки %s %s', method, target)
+                    response = _error(HTTPStatus.INTERNAL_SERVER_ERROR, 'Внутренняя ошибка сервера')
+                response = await self._encode(response, headers)
+                await self._write(writer, method, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # Клиент закрыл соединение или не дослал тело запроса
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self._client, host, port, limit=MAX_HEADER_BYTES)
+        addresses = ', '.join(str(sock.getsockname()[:2]) for sock in server.sockets)
+        print(f'✅ Olympic Reserve API: {addresses}')
+        async with server:
+            await server.serve_forever()
+
+# ===== КОМАНДНАЯ СТРОКА =====
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP API Olympic Reserve (только чтение)')
+    parser.add_argument('--host', default=HOST, help='адрес (по умолчанию - только локальный)')
+    parser.add_argument('--port', type=int, default=PORT, help='порт')
+    parser.add_argument('--db', default=db.DB_NAME, help='путь к файлу SQLite')
+    parser.add_argument('--workers', type=int, default=None, help='потоков для запросов к БД')
+    args = parser.parse_args(argv)
+
+    db.DB_NAME = args.db
+    migrations.migrate(args.db)
+    try:
+        asyncio.run(ApiServer(args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_pools()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
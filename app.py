@@ -6,15 +6,24 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import sqlite3
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, date, timedelta
 import io
-import base64
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+import analytics
+import auth
+import db
+import frames
+import instrumentation
+import migrations
+import queries
+
+# plotly (charts.py) и reportlab (reports.py) импортируются в функциях страниц:
+# страница входа не тратит на них время при холодном старте
 
 # ===== КОНФИГУРАЦИЯ =====
 st.set_page_config(
@@ -24,136 +33,460 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-DB_NAME = 'olympic_reserve.db'
-CACHE_DURATION = 3600  # 1 час
+DB_NAME = db.DB_NAME
+# Кэш инвалидируется по версиям таблиц (table_versions), а не по времени
+CACHE_MAX_ENTRIES = 256
+ATHLETE_CACHE_MAX_ENTRIES = 5000
+PAGE_SIZES = [25, 50, 100]
+PICKER_LIMIT = 50  # вариантов в списке выбора спортсмена
+CALENDAR_DAYS = 90  # период календаря сборов по умолчанию (последние дни)
 
-# ===== МОКИРОВАННЫЕ УЧЕТНЫЕ ДАННЫЕ =====
-USERS = {
-    'admin': {'password': 'admin123', 'role': 'admin', 'sport': None},
-    'curator_rowing': {'password': 'curator123', 'role': 'curator', 'sport': 'Гребля'},
-    'curator_skiing': {'password': 'curator123', 'role': 'curator', 'sport': 'Лыжные гонки'},
-    'curator_biathlon': {'password': 'curator123', 'role': 'curator', 'sport': 'Биатлон'},
-}
+WARMUP_ENABLED = os.environ.get('OLYMPIC_RESERVE_WARMUP', '1') == '1'
+WARMUP_THREAD = 'olympic-reserve-warm-up'
+
+logger = logging.getLogger(__name__)
+
+# ===== УЧЕТНЫЕ ДАННЫЕ (auth.py) =====
+USERS = auth.USERS
+
+# Области видимости кэша: администратор (sport=None) и вид спорта каждого куратора
+CACHE_SCOPES = 1 + len({user['sport'] for user in USERS.values() if user['sport']})
+TREND_WINDOWS = (2, 6)  # окно скользящего среднего на странице динамики тестов
+# Полные таблицы и расчеты по ним: записей не больше, чем реальных ключей
+# (область × таблица или параметры). Версия таблицы входит в ключ, поэтому
+# после записи в БД LRU вытесняет копию прежней версии, а не копит их
+TABLE_CACHE_MAX_ENTRIES = CACHE_SCOPES * len(db.TABLES)
+RANKING_CACHE_MAX_ENTRIES = (CACHE_SCOPES * len(analytics.TEST_METRICS)
+                             * (TREND_WINDOWS[1] - TREND_WINDOWS[0] + 1))
+CAMP_CACHE_MAX_ENTRIES = CACHE_SCOPES
 
 # ===== ФУНКЦИИ РАБОТЫ С БД =====
 
 @st.cache_resource
-def get_db_connection():
-    """Получить подключение к БД"""
+def init_database():
+    """Применить миграции схемы один раз при старте сервера"""
+    return migrations.migrate(DB_NAME)
+
+def _warm_up():
+    """Прогрев после старта сервера: импорты, шрифты, пул соединений и кэш.
+
+    Заполняет те же записи st.cache_data, что и загрузчики страниц (те же
+    аргументы), для администратора и видов спорта кураторов.
+    """
+    start = time.perf_counter()
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        return conn
+        import charts  # noqa: F401 - plotly
+        import reports
+        reports.register_fonts()
+        
+        open_snapshot()
+        
+        sports = [None] + sorted({user['sport'] for user in USERS.values() if user['sport']})
+        for sport in sports:
+            _cached_athlete_summary(sport, table_versions('athletes'))
+            _cached_finance_summary(sport, table_versions('financial_records', 'athletes'))
+            for table in ('athletes', 'functional_tests', 'training_camps'):
+                _table_frame(table, sport, scoped_versions(table, sport))
+            _cached_test_ranking(sport, next(iter(analytics.TEST_METRICS)), 3,
+                                 table_versions('functional_tests', 'athletes'))
+            _cached_camp_analytics(sport, scoped_versions('training_camps', sport))
+        _cached_cohort_index(table_versions('athletes', 'medical_records', 'psychological_records'))
+    except Exception:
+        logger.exception('Ошибка прогрева кэша')
+        return
+    logger.info('Прогрев завершен за %.1f с', time.perf_counter() - start)
+
+@st.cache_resource
+def start_warm_up():
+    """Запустить прогрев один раз на процесс в фоновом потоке.
+
+    Пока пользователь вводит логин и пароль, поток импортирует тяжелые
+    модули и заполняет кэш; страницы не ждут его завершения.
+    """
+    if not WARMUP_ENABLED:
+        return None
+    # Поток прогрева не связан с сессией: предупреждения Streamlit об этом
+    # ("missing ScriptRunContext") для него не выводятся
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    logging.getLogger(get_script_run_ctx.__module__).addFilter(
+        lambda record: record.threadName != WARMUP_THREAD)
+    thread = threading.Thread(target=_warm_up, name=WARMUP_THREAD, daemon=True)
+    thread.start()
+    return thread
+
+def table_versions(*tables):
+    """Версии таблиц (счетчики изменений из table_versions).
+
+    Версия входит в ключ кэша: таблица перечитывается только после
+    записи в нее, а кэш остальных таблиц остается действительным.
+    """
+    try:
+        versions = queries.table_versions()
+    except Exception:
+        versions = {}
+    return tuple(versions.get(table, 0) for table in tables)
+
+def _scope_key(table, sport, version, athletes_version):
+    if sport is None or table in queries.SPORT_TABLES:
+        return (version,)
+    return (version, athletes_version)
+
+def scoped_versions(table, sport=None):
+    """Версии, от которых зависит выборка таблицы для вида спорта.
+
+    Строки дочерних таблиц выбираются по athletes.sport, поэтому при
+    переводе спортсмена в другой вид спорта выборка куратора меняется
+    вместе с версией athletes.
+    """
+    return _scope_key(table, sport, *table_versions(table, 'athletes'))
+
+@st.cache_resource(max_entries=1)
+def _cached_snapshot(directory, mtime):
+    # Один экземпляр на процесс: таблицы отображаются в память, а не копируются
+    import snapshot
+    try:
+        return snapshot.Snapshot(directory)
     except Exception as e:
-        st.error(f"❌ Ошибка подключения к БД: {e}")
+        logger.warning("Снимок Arrow %s не загружен: %s", directory, e)
         return None
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_athletes():
-    """Загрузить всех спортсменов из БД"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+def open_snapshot():
+    """Снимок Arrow IPC (snapshot.py) или None, если его нет или нет pyarrow.
+
+    Новый снимок (другое время изменения манифеста) отображается заново.
+    """
     try:
-        df = pd.read_sql('SELECT * FROM athletes', conn)
-        conn.close()
-        return df
+        import snapshot
+    except ImportError:
+        return None
+    mtime = snapshot.manifest_mtime()
+    if mtime is None:
+        return None
+    return _cached_snapshot(snapshot.SNAPSHOT_DIR, mtime)
+
+@st.cache_resource(max_entries=TABLE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _snapshot_table(table, sport, versions, created_at, _snap):
+    # Один DataFrame на процесс поверх отображенных в память буферов Arrow:
+    # типы уже компактные (snapshot.export), копии и pickle st.cache_data нет.
+    # Объект общий для всех сессий и только читается
+    return _snap.read(table, sport)
+
+@st.cache_data(max_entries=TABLE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_table(table, sport, versions):
+    # Компактные типы уменьшают копию, которую st.cache_data отдает каждому перезапуску
+    return frames.compact(queries.scoped_table(table, sport), table)
+
+def _table_frame(table, sport, versions):
+    """Таблица из снимка Arrow, если он покрывает версии versions, иначе из БД.
+
+    versions - scoped_versions(table, sport): для выборки дочерней таблицы
+    по виду спорта вторым идет версия athletes.
+    """
+    snap = open_snapshot()
+    if snap is not None and snap.covers(table, *versions):
+        return _snapshot_table(table, sport, versions, snap.manifest['created_at'], snap)
+    return _cached_table(table, sport, versions)
+
+def _load_table(table, sport=None):
+    """Загрузить таблицу (только строки вида спорта, если sport задан).
+
+    Таблица из снимка - общий объект процесса: изменять ее на месте нельзя.
+    """
+    try:
+        return _table_frame(table, sport, scoped_versions(table, sport))
     except Exception as e:
-        st.error(f"❌ Ошибка загрузки спортсменов: {e}")
+        st.error(f"❌ Ошибка загрузки таблицы {table}: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_medical_records():
+@instrumentation.timed(cached=True)
+def load_athletes(sport=None):
+    """Загрузить всех спортсменов из БД"""
+    return _load_table('athletes', sport)
+
+@instrumentation.timed(cached=True)
+def load_medical_records(sport=None):
     """Загрузить медицинские записи"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+    return _load_table('medical_records', sport)
+
+@instrumentation.timed(cached=True)
+def load_psychological_records(sport=None):
+    """Загрузить психологические записи"""
+    return _load_table('psychological_records', sport)
+
+@instrumentation.timed(cached=True)
+def load_financial_records(sport=None):
+    """Загрузить финансовые записи"""
+    return _load_table('financial_records', sport)
+
+@instrumentation.timed(cached=True)
+def load_mentorship(sport=None):
+    """Загрузить данные наставничества"""
+    return _load_table('mentorship', sport)
+
+@instrumentation.timed(cached=True)
+def load_training_camps(sport=None):
+    """Загрузить данные тренировочных сборов"""
+    return _load_table('training_camps', sport)
+
+@instrumentation.timed(cached=True)
+def load_functional_tests(sport=None):
+    """Загрузить функциональные тесты"""
+    return _load_table('functional_tests', sport)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_athlete_summary(sport, version):
+    return queries.athlete_summary(sport)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_finance_summary(sport, version):
+    return queries.finance_summary(sport)
+
+@st.cache_data(max_entries=RANKING_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_test_ranking(sport, metric, window, versions):
+    tests_version, athletes_version = versions
+    return analytics.improvement_ranking(
+        _table_frame('functional_tests', sport,
+                     _scope_key('functional_tests', sport, tests_version, athletes_version)),
+        _table_frame('athletes', sport, (athletes_version,)),
+        metric, window)
+
+@instrumentation.timed(cached=True)
+def load_test_ranking(metric, window, sport=None):
+    """Рейтинг спортсменов по темпу прогресса в функциональных тестах"""
     try:
-        df = pd.read_sql('SELECT * FROM medical_records', conn)
-        conn.close()
-        return df
+        return _cached_test_ranking(sport, metric, window,
+                                    table_versions('functional_tests', 'athletes'))
     except Exception as e:
+        st.error(f"❌ Ошибка расчета динамики тестов: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_psychological_records():
-    """Загрузить психологические записи"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+@st.cache_data(max_entries=CAMP_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_camp_analytics(sport, versions):
+    df_camps = _table_frame('training_camps', sport, versions)
+    return {
+        'intervals': analytics.camp_intervals(df_camps, include_cancelled=True),
+        'overlaps': analytics.camp_overlaps(df_camps),
+        'weekly': analytics.weekly_training_hours(df_camps),
+        'occupancy': analytics.location_occupancy(df_camps),
+        'capacity': analytics.location_capacity(df_camps),
+    }
+
+@instrumentation.timed(cached=True)
+def load_camp_analytics(sport=None):
+    """Календарь, пересечения, недельная нагрузка и загрузка баз сборов"""
     try:
-        df = pd.read_sql('SELECT * FROM psychological_records', conn)
-        conn.close()
-        return df
+        return _cached_camp_analytics(sport, scoped_versions('training_camps', sport))
     except Exception as e:
-        return pd.DataFrame()
+        st.error(f"❌ Ошибка расчета аналитики сборов: {e}")
+        return None
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_financial_records():
-    """Загрузить финансовые записи"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+@st.cache_resource(max_entries=4)
+@instrumentation.cache_miss
+def _cached_cohort_index(versions):
+    # Индекс только читается, поэтому хранится в одном экземпляре без копирования
+    return analytics.CohortIndex(queries.cohort_metrics())
+
+@instrumentation.timed(cached=True)
+def load_cohort_index():
+    """Отсортированные показатели по когортам (вид спорта × пол × возраст)"""
     try:
-        df = pd.read_sql('SELECT * FROM financial_records', conn)
-        conn.close()
-        return df
+        return _cached_cohort_index(
+            table_versions('athletes', 'medical_records', 'psychological_records'))
     except Exception as e:
-        return pd.DataFrame()
+        st.error(f"❌ Ошибка построения когорт: {e}")
+        return None
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_mentorship():
-    """Загрузить данные наставничества"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+@instrumentation.timed(cached=True)
+def load_athlete_summary(sport=None):
+    """Сводка по спортсменам (вид спорта × резерв × пол)"""
     try:
-        df = pd.read_sql('SELECT * FROM mentorship', conn)
-        conn.close()
-        return df
+        return _cached_athlete_summary(sport, table_versions('athletes'))
     except Exception as e:
+        st.error(f"❌ Ошибка загрузки сводки: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_training_camps():
-    """Загрузить данные тренировочных сборов"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-    
+@instrumentation.timed(cached=True)
+def load_finance_summary(sport=None):
+    """Сводка по финансированию (вид спорта × источник × месяц)"""
     try:
-        df = pd.read_sql('SELECT * FROM training_camps', conn)
-        conn.close()
-        return df
+        return _cached_finance_summary(sport, table_versions('financial_records', 'athletes'))
     except Exception as e:
+        st.error(f"❌ Ошибка загрузки сводки: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=CACHE_DURATION)
-def load_functional_tests():
-    """Загрузить функциональные тесты"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
+# ===== ПОСТРАНИЧНЫЕ ТАБЛИЦЫ =====
+
+# От каких таблиц зависит каждая постраничная выборка из queries.PAGED_QUERIES
+PAGED_TABLE_SOURCES = {
+    'athletes': ('athletes',),
+    'mentorship': ('mentorship', 'athletes'),
+}
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_paged_count(name, sport, search, filters, version):
+    return queries.paged_count(name, sport, search, dict(filters))
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_paged_rows(name, sport, search, filters, sort_by, descending, limit, offset, version):
+    return queries.paged_rows(name, sport, search, dict(filters), sort_by, descending, limit, offset)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_distinct_values(name, column, sport, version):
+    return queries.distinct_values(name, column, sport)
+
+@instrumentation.timed(cached=True)
+def paged_total(name, sport=None):
+    """Число строк постраничной выборки без поиска и фильтров"""
+    return _cached_paged_count(name, sport, '', (), table_versions(*PAGED_TABLE_SOURCES[name]))
+
+@instrumentation.timed(cached=True)
+def paginated_table(name, labels, filter_columns=()):
+    """Таблица с постраничной загрузкой из БД.
+
+    Поиск, фильтры и сортировка выполняются в SQL (LIMIT/OFFSET),
+    в браузер передается только текущая страница.
+    """
+    sport = user_sport()
+    versions = table_versions(*PAGED_TABLE_SOURCES[name])
+    columns = queries.PAGED_QUERIES[name]['columns']
+    
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        search = st.text_input("🔍 Поиск", key=f"{name}_search")
+    with col2:
+        sort_by = st.selectbox("Сортировка", columns, format_func=labels.get,
+                               key=f"{name}_sort")
+    with col3:
+        descending = st.checkbox("По убыванию", key=f"{name}_desc")
+    with col4:
+        page_size = st.selectbox("Строк на странице", PAGE_SIZES, key=f"{name}_page_size")
     
     try:
-        df = pd.read_sql('SELECT * FROM functional_tests', conn)
-        conn.close()
-        return df
+        filters = {}
+        if filter_columns:
+            for col, column in zip(st.columns(len(filter_columns)), filter_columns):
+                options = _cached_distinct_values(name, column, sport, versions)
+                with col:
+                    value = st.selectbox(labels[column], ["Все"] + options,
+                                         key=f"{name}_filter_{column}")
+                if value != "Все":
+                    filters[column] = value
+        filters = tuple(sorted(filters.items()))
+        
+        total = _cached_paged_count(name, sport, search, filters, versions)
+        pages = max(1, math.ceil(total / page_size))
+        page_key = f"{name}_page"
+        if st.session_state.get(page_key, 1) > pages:
+            st.session_state[page_key] = pages
+        page = st.number_input(f"Страница (всего страниц: {pages}, строк: {total})",
+                               min_value=1, max_value=pages, step=1, key=page_key)
+        
+        df_page = _cached_paged_rows(name, sport, search, filters, sort_by, descending,
+                                     page_size, (page - 1) * page_size, versions)
     except Exception as e:
-        return pd.DataFrame()
+        st.error(f"❌ Ошибка загрузки таблицы: {e}")
+        return
+    
+    st.dataframe(df_page.rename(columns=labels), use_container_width=True, hide_index=True)
+
+# ===== ЗАПРОСЫ ПО ОДНОМУ СПОРТСМЕНУ (кэш по athlete_id и версии таблицы) =====
+
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_athlete(athlete_id, version):
+    return queries.get_athlete(athlete_id)
+
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_latest_medical_exam(athlete_id, version):
+    return queries.latest_medical_exam(athlete_id)
+
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_latest_psych_assessment(athlete_id, version):
+    return queries.latest_psych_assessment(athlete_id)
+
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_test_history(athlete_id, version):
+    return queries.test_history(athlete_id)
+
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_athlete_matches(term, sport, limit, version):
+    return queries.search_athletes(term, sport, limit)
+
+@instrumentation.timed(cached=True)
+def search_athletes(term, sport=None):
+    """Спортсмены для списка выбора: первые PICKER_LIMIT совпадений по ФИО/ID"""
+    try:
+        return _cached_athlete_matches(term.strip(), sport, PICKER_LIMIT,
+                                       table_versions('athletes'))
+    except Exception as e:
+        st.error(f"❌ Ошибка поиска спортсменов: {e}")
+        return pd.DataFrame(columns=['athlete_id', 'full_name', 'sport'])
+
+def athlete_picker(key, label="Выберите спортсмена"):
+    """Поле поиска и список выбора спортсмена (не больше PICKER_LIMIT вариантов).
+
+    Поиск идет по индексу (FTS5), выбранный athlete_id хранится в сессии
+    под ключом f'{key}_athlete_id'. Возвращает athlete_id или None.
+    """
+    search = st.text_input("🔍 Поиск спортсмена", key=f"{key}_search",
+                           placeholder="ФИО или ID спортсмена")
+    df_matches = search_athletes(search, user_sport())
+    
+    if df_matches.empty:
+        if search.strip():
+            st.warning("⚠️ Ничего не найдено")
+        else:
+            st.warning("⚠️ Спортсмены не найдены для вашего вида спорта")
+        return None
+    
+    names = dict(zip(df_matches['athlete_id'], df_matches['full_name']))
+    options = list(names)
+    current = st.session_state.get(f'{key}_athlete_id')
+    index = options.index(current) if current in options else 0
+    
+    athlete_id = st.selectbox(label, options, index=index, key=f"{key}_select",
+                              format_func=lambda i: f"{i} - {names[i]}")
+    st.session_state[f'{key}_athlete_id'] = athlete_id
+    return athlete_id
+
+@instrumentation.timed(cached=True)
+def load_athlete(athlete_id):
+    """Карточка спортсмена"""
+    return _cached_athlete(athlete_id, table_versions('athletes'))
+
+@instrumentation.timed(cached=True)
+def load_latest_medical_exam(athlete_id):
+    """Последний медицинский осмотр спортсмена"""
+    return _cached_latest_medical_exam(athlete_id, table_versions('medical_records'))
+
+@instrumentation.timed(cached=True)
+def load_latest_psych_assessment(athlete_id):
+    """Последняя психологическая оценка спортсмена"""
+    return _cached_latest_psych_assessment(athlete_id, table_versions('psychological_records'))
+
+@instrumentation.timed(cached=True)
+def load_test_history(athlete_id):
+    """История функциональных тестов спортсмена"""
+    return _cached_test_history(athlete_id, table_versions('functional_tests'))
 
 # ===== ФУНКЦИИ АУТЕНТИФИКАЦИИ =====
 
 def authenticate(username, password):
     """Проверить учетные данные"""
-    if username in USERS and USERS[username]['password'] == password:
-        return USERS[username]
-    return None
+    return auth.authenticate(username, password)
 
 def login_page():
     """Страница входа"""
@@ -187,56 +520,82 @@ def login_page():
             "- **curator_skiing** / curator123 - Куратор лыжных гонок\n"
             "- **curator_biathlon** / curator123 - Куратор биатлона")
 
+def user_sport():
+    """Вид спорта куратора (None - администратор, доступ ко всем видам спорта)"""
+    user = st.session_state.user
+    return user['sport'] if user['role'] == 'curator' else None
+
 # ===== ФУНКЦИИ ГЕНЕРАЦИИ ОТЧЕТОВ =====
 
+@st.cache_data(max_entries=ATHLETE_CACHE_MAX_ENTRIES)
+@instrumentation.cache_miss
+def _cached_passport(content_hash, _athlete, _medical, _psych):
+    import reports
+    # Ключ кэша - только хэш содержимого (аргументы с "_" Streamlit не хэширует)
+    return reports.render_passport(_athlete, _medical, _psych)
+
+@instrumentation.timed(cached=True)
 def generate_athlete_report_pdf(athlete_id, athlete_name):
     """Генерирование PDF отчета о спортсмене"""
-    df_athletes = load_athletes()
-    df_medical = load_medical_records()
-    df_psych = load_psychological_records()
+    import reports
     
-    athlete = df_athletes[df_athletes['athlete_id'] == athlete_id]
-    if athlete.empty:
+    athlete = load_athlete(athlete_id)
+    if athlete is None:
         return None
     
-    athlete = athlete.iloc[0]
-    
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    # Заголовок
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, height - 50, "СПОРТИВНЫЙ ПАСПОРТ")
-    
-    p.setFont("Helvetica", 11)
-    p.drawString(50, height - 80, f"Спортсмен: {athlete['full_name']}")
-    p.drawString(50, height - 100, f"Вид спорта: {athlete['sport']}")
-    p.drawString(50, height - 120, f"Возраст: {athlete['age']} лет")
-    p.drawString(50, height - 140, f"Пол: {athlete['gender']}")
-    p.drawString(50, height - 160, f"Федерация: {athlete['federation']}")
-    
-    # Физические показатели
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, height - 200, "ФИЗИЧЕСКИЕ ПОКАЗАТЕЛИ")
-    
-    p.setFont("Helvetica", 10)
-    y = height - 230
-    p.drawString(50, y, f"VO₂max: {athlete['vo2_max_ml_kg_min']} мл·кг⁻¹·мин⁻¹")
-    y -= 20
-    p.drawString(50, y, f"Рост: {athlete['height_cm']} см")
-    y -= 20
-    p.drawString(50, y, f"Вес: {athlete['weight_kg']} кг")
-    y -= 20
-    p.drawString(50, y, f"Жировая ткань: {athlete['body_fat_percent']}%")
-    y -= 20
-    p.drawString(50, y, f"Мышечная масса: {athlete['muscle_mass_percent']}%")
-    
-    p.showPage()
-    p.save()
-    
-    buffer.seek(0)
-    return buffer
+    medical = load_latest_medical_exam(athlete_id)
+    psych = load_latest_psych_assessment(athlete_id)
+    pdf = _cached_passport(reports.passport_hash(athlete, medical, psych),
+                           athlete, medical, psych)
+    return io.BytesIO(pdf)
+
+def show_passport_export():
+    """Пакетная выгрузка спортивных паспортов (ZIP)"""
+    import reports
+    
+    with st.expander("📦 Спортивные паспорта (ZIP)"):
+        sport = user_sport()
+        if sport is None:
+            sports = sorted(load_athlete_summary()['sport'].unique())
+            choice = st.selectbox("Вид спорта", ["Все"] + sports, key="export_sport")
+            sport = None if choice == "Все" else choice
+        
+        levels = sorted(load_athlete_summary(sport)['reserve_level'].unique())
+        reserve_levels = st.multiselect("Уровень резерва", levels, key="export_levels")
+        
+        if st.button("Сформировать архив", key="export_build"):
+            try:
+                athlete_ids = reports.select_athlete_ids(sport, reserve_levels)
+            except Exception as e:
+                st.error(f"❌ Ошибка формирования паспортов: {e}")
+                return
+            
+            if len(athlete_ids) > reports.UI_EXPORT_LIMIT:
+                command = "python reports.py"
+                if sport is not None:
+                    command += f' --sport "{sport}"'
+                command += ''.join(f' --reserve-level "{level}"' for level in reserve_levels)
+                st.warning(f"⚠️ Паспортов: {len(athlete_ids)}. В дашборде формируется не больше "
+                           f"{reports.UI_EXPORT_LIMIT}: выберите вид спорта или уровень резерва "
+                           f"либо выгрузите архив на сервере командой")
+                st.code(f"{command} --out passports.zip", language="bash")
+                return
+            
+            with st.spinner("⏳ Формирование паспортов..."):
+                try:
+                    # Архив пишется на диск по мере готовности PDF; в память
+                    # читается только итоговый ZIP для кнопки скачивания
+                    with tempfile.TemporaryFile() as archive:
+                        count = reports.export_passports_zip(athlete_ids, archive)
+                        archive.seek(0)
+                        data = archive.read()
+                except Exception as e:
+                    st.error(f"❌ Ошибка формирования паспортов: {e}")
+                    return
+            
+            st.success(f"✅ Паспортов в архиве: {count}")
+            st.download_button("⬇️ Скачать архив", data, file_name="passports.zip",
+                               mime="application/zip", key="export_download")
 
 # ===== ГЛАВНАЯ ПАНЕЛЬ УПРАВЛЕНИЯ =====
 
@@ -255,12 +614,17 @@ def dashboard():
         
         st.markdown("---")
         
-        page = st.radio("📊 Навигация",
-                       ["Общая статистика",
-                        "Профиль спортсмена",
-                        "Анализ данных",
-                        "Финансирование",
-                        "Наставничество"])
+        pages = ["Общая статистика",
+                 "Профиль спортсмена",
+                 "Анализ данных",
+                 "Динамика тестов",
+                 "Тренировочные сборы",
+                 "Финансирование",
+                 "Наставничество"]
+        if st.session_state.user['role'] == 'admin':
+            pages.append("Диагностика")
+        
+        page = st.radio("📊 Навигация", pages)
         
         st.markdown("---")
         if st.button("🚪 Выход", use_container_width=True):
@@ -276,43 +640,49 @@ def dashboard():
         show_athlete_profile()
     elif page == "Анализ данных":
         show_data_analysis()
+    elif page == "Динамика тестов":
+        show_test_trends()
+    elif page == "Тренировочные сборы":
+        show_training_camps()
     elif page == "Финансирование":
         show_financing()
     elif page == "Наставничество":
         show_mentorship_page()
+    elif page == "Диагностика" and st.session_state.user['role'] == 'admin':
+        show_diagnostics()
 
 # ===== СТРАНИЦА 1: ОБЩАЯ СТАТИСТИКА =====
 
+@instrumentation.timed(kind='page')
 def show_general_statistics():
     """Страница общей статистики"""
+    import plotly.express as px
+    
     st.header("📊 Общая статистика программы")
     
-    df_athletes = load_athletes()
+    # Метрики и графики строятся по сводной таблице (несколько сотен строк)
+    df_summary = load_athlete_summary(user_sport())
     
-    if df_athletes.empty:
+    if df_summary.empty:
         st.error("❌ Данные не загружены. Проверьте базу данных.")
         return
     
-    # Фильтрация по правам доступа
-    if st.session_state.user['role'] == 'curator':
-        df_athletes = df_athletes[df_athletes['sport'] == st.session_state.user['sport']]
-    
     # Метрики
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("👥 Всего спортсменов", len(df_athletes))
+        st.metric("👥 Всего спортсменов", int(df_summary['athlete_count'].sum()))
     
     with col2:
-        main_pool = len(df_athletes[df_athletes['reserve_level'] == 'Основной пул'])
-        st.metric("🎯 Основной пул", main_pool)
+        main_pool = df_summary.loc[df_summary['reserve_level'] == 'Основной пул', 'athlete_count'].sum()
+        st.metric("🎯 Основной пул", int(main_pool))
     
     with col3:
-        avg_vo2 = df_athletes['vo2_max_ml_kg_min'].mean()
+        avg_vo2 = df_summary['vo2_sum'].sum() / max(df_summary['vo2_count'].sum(), 1)
         st.metric("📈 Средний VO₂max", f"{avg_vo2:.1f}")
     
     with col4:
-        avg_age = df_athletes['age'].mean()
+        avg_age = df_summary['age_sum'].sum() / max(df_summary['age_count'].sum(), 1)
         st.metric("📅 Средний возраст", f"{avg_age:.1f}")
     
     st.markdown("---")
@@ -321,13 +691,15 @@ def show_general_statistics():
     col1, col2 = st.columns(2)
     
     with col1:
-        sport_counts = df_athletes['sport'].value_counts()
+        sport_counts = (df_summary.groupby('sport')['athlete_count'].sum()
+                        .sort_values(ascending=False))
         fig = px.pie(values=sport_counts.values, names=sport_counts.index,
                     title="Распределение по видам спорта")
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
-        reserve_counts = df_athletes['reserve_level'].value_counts()
+        reserve_counts = (df_summary.groupby('reserve_level')['athlete_count'].sum()
+                          .sort_values(ascending=False))
         fig = px.bar(x=reserve_counts.index, y=reserve_counts.values,
                     title="Распределение по пулам",
                     labels={'x': 'Уровень резерва', 'y': 'Количество'})
@@ -338,41 +710,35 @@ def show_general_statistics():
     # Таблица спортсменов
     st.subheader("📋 Список спортсменов")
     
-    df_display = df_athletes[['athlete_id', 'full_name', 'gender', 'age', 'sport',
-                               'reserve_level', 'vo2_max_ml_kg_min', 'status']].copy()
-    df_display.columns = ['ID', 'ФИО', 'Пол', 'Возраст', 'Вид спорта',
-                          'Резерв', 'VO₂max', 'Статус']
+    filter_columns = ['gender', 'reserve_level', 'status']
+    if user_sport() is None:
+        filter_columns.append('sport')
     
-    st.dataframe(df_display, use_container_width=True, hide_index=True)
+    paginated_table('athletes',
+                    {'athlete_id': 'ID', 'full_name': 'ФИО', 'gender': 'Пол',
+                     'age': 'Возраст', 'sport': 'Вид спорта', 'reserve_level': 'Резерв',
+                     'vo2_max_ml_kg_min': 'VO₂max', 'status': 'Статус'},
+                    filter_columns)
+    
+    st.markdown("---")
+    show_passport_export()
 
 # ===== СТРАНИЦА 2: ПРОФИЛЬ СПОРТСМЕНА =====
 
+@instrumentation.timed(kind='page')
 def show_athlete_profile():
     """Страница профиля спортсмена"""
     st.header("👤 Профиль спортсмена")
     
-    df_athletes = load_athletes()
-    
-    if df_athletes.empty:
-        st.error("❌ Данные не загружены.")
+    athlete_id = athlete_picker('profile')
+    if athlete_id is None:
         return
     
-    # Фильтрация по правам доступа
-    if st.session_state.user['role'] == 'curator':
-        df_athletes = df_athletes[df_athletes['sport'] == st.session_state.user['sport']]
-    
-    athlete_options = [f"{row['athlete_id']} - {row['full_name']}" 
-                       for _, row in df_athletes.iterrows()]
-    
-    if not athlete_options:
-        st.warning("⚠️ Спортсмены не найдены для вашего вида спорта")
+    athlete = load_athlete(athlete_id)
+    if athlete is None or (user_sport() is not None and athlete['sport'] != user_sport()):
+        st.warning("⚠️ Спортсмен не найден")
         return
     
-    selected = st.selectbox("Выберите спортсмена", athlete_options)
-    athlete_id = selected.split(' - ')[0]
-    
-    athlete = df_athletes[df_athletes['athlete_id'] == athlete_id].iloc[0]
-    
     # Основная информация
     col1, col2, col3 = st.columns(3)
     
@@ -401,13 +767,9 @@ def show_athlete_profile():
     
     # Медицинские данные
     st.subheader("🏥 Медицинские данные")
-    df_medical = load_medical_records()
-    
-    medical_athlete = df_medical[df_medical['athlete_id'] == athlete_id]
+    latest = load_latest_medical_exam(athlete_id)
     
-    if not medical_athlete.empty:
-        latest = medical_athlete.sort_values('exam_date').iloc[-1]
-        
+    if latest is not None:
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Последний вес", f"{latest['weight_kg']} кг")
@@ -425,12 +787,9 @@ def show_athlete_profile():
     st.markdown("---")
     st.subheader("🧠 Психологический профиль")
     
-    df_psych = load_psychological_records()
-    psych_athlete = df_psych[df_psych['athlete_id'] == athlete_id]
+    psych = load_latest_psych_assessment(athlete_id)
     
-    if not psych_athlete.empty:
-        psych = psych_athlete.iloc[-1]
-        
+    if psych is not None:
         col1, col2 = st.columns(2)
         
         with col1:
@@ -442,65 +801,107 @@ def show_athlete_profile():
             st.write(f"**Концентрация:** {psych['concentration_ability_1_10']}/10")
             st.write(f"**Командное взаимодействие:** {psych['team_cooperation_1_10']}/10")
             st.write(f"**Общий балл:** {psych['overall_psychological_score_1_100']}/100")
+    
+    # Сравнение с когортой: бинарный поиск в заранее отсортированных массивах
+    st.markdown("---")
+    st.subheader("📊 Сравнение с когортой")
+    
+    cohort_index = load_cohort_index()
+    if cohort_index is not None:
+        df_profile = cohort_index.profile(athlete, latest, psych)
+        key = analytics.cohort_key(athlete['sport'], athlete['gender'], athlete['age'])
+        st.caption(f"Когорта: {athlete['sport']}, {athlete['gender']}, {key[2]} лет — "
+                   f"спортсменов: {cohort_index.cohort_size(key)}. "
+                   "100 — лучший результат в когорте.")
+        st.dataframe(df_profile, use_container_width=True, hide_index=True,
+                     column_config={
+                         'metric': 'Показатель',
+                         'value': 'Значение',
+                         'percentile': st.column_config.ProgressColumn(
+                             'Процентиль', min_value=0, max_value=100, format='%.0f'),
+                         'cohort_size': 'Выборка',
+                     })
+    
+    # Спортивный паспорт: PDF формируется только по запросу (дальше берется
+    # из кэша, пока данные спортсмена не менялись)
+    if st.button("📄 Сформировать спортивный паспорт (PDF)", key=f"passport_build_{athlete_id}"):
+        st.session_state.passport_athlete_id = athlete_id
+    if st.session_state.get('passport_athlete_id') == athlete_id:
+        pdf = generate_athlete_report_pdf(athlete_id, athlete['full_name'])
+        if pdf is not None:
+            st.download_button("⬇️ Скачать спортивный паспорт (PDF)", pdf,
+                               file_name=f"passport_{athlete_id}.pdf", mime="application/pdf")
+    
+    # Функциональные тесты
+    st.markdown("---")
+    st.subheader("🔬 Функциональные тесты")
+    
+    df_tests = load_test_history(athlete_id)
+    
+    if not df_tests.empty:
+        df_display = df_tests[['test_date', 'test_type', 'vo2_max_ml_kg_min',
+                               'anaerobic_threshold_percent', 'peak_power_watts',
+                               'performance_time_seconds']].copy()
+        df_display.columns = ['Дата', 'Тип теста', 'VO₂max', 'АнП, %',
+                              'Пиковая мощность, Вт', 'Время, с']
+        st.dataframe(df_display, use_container_width=True, hide_index=True)
 
 # ===== СТРАНИЦА 3: АНАЛИЗ ДАННЫХ =====
 
+@instrumentation.timed(kind='page')
 def show_data_analysis():
     """Страница анализа данных"""
+    import charts
+    
     st.header("📈 Анализ данных")
     
-    df_athletes = load_athletes()
+    # Куратор получает только строки своего вида спорта
+    df_athletes = load_athletes(user_sport())
     
     if df_athletes.empty:
         st.error("❌ Данные не загружены.")
         return
     
-    # Фильтрация по правам доступа
-    if st.session_state.user['role'] == 'curator':
-        df_athletes = df_athletes[df_athletes['sport'] == st.session_state.user['sport']]
-    
-    # Корреляция VO₂max и рейтинга
-    fig = px.scatter(df_athletes, x='vo2_max_ml_kg_min', y='rating_position',
-                    color='gender', size='training_experience_years',
-                    hover_name='full_name',
-                    title='Корреляция VO₂max и рейтинга',
-                    labels={'vo2_max_ml_kg_min': 'VO₂max (мл·кг⁻¹·мин⁻¹)',
-                           'rating_position': 'Позиция в рейтинге'})
+    # Корреляция VO₂max и рейтинга (WebGL/агрегация на больших реестрах, см. charts.py)
+    fig = charts.scatter(df_athletes, x='vo2_max_ml_kg_min', y='rating_position',
+                         color='gender', size='training_experience_years',
+                         hover_name='full_name',
+                         title='Корреляция VO₂max и рейтинга',
+                         labels={'vo2_max_ml_kg_min': 'VO₂max (мл·кг⁻¹·мин⁻¹)',
+                                 'rating_position': 'Позиция в рейтинге'})
     st.plotly_chart(fig, use_container_width=True)
     
-    # Распределение по возрасту
-    fig = px.histogram(df_athletes, x='age', nbins=10,
-                      color='gender',
-                      title='Распределение спортсменов по возрасту',
-                      labels={'age': 'Возраст', 'count': 'Количество'})
+    # Распределение по возрасту (интервалы считаются на сервере)
+    fig = charts.histogram(df_athletes, x='age', nbins=10,
+                           color='gender',
+                           title='Распределение спортсменов по возрасту',
+                           labels={'age': 'Возраст', 'count': 'Количество'})
     st.plotly_chart(fig, use_container_width=True)
 
 # ===== СТРАНИЦА 4: ФИНАНСИРОВАНИЕ =====
 
+@instrumentation.timed(kind='page')
 def show_financing():
     """Страница финансирования"""
+    import plotly.express as px
+    
     st.header("💰 Финансирование программы")
     
-    df_athletes = load_athletes()
-    df_financial = load_financial_records()
+    # Сводка по источникам и месяцам вместо всей таблицы financial_records
+    df_financial = load_finance_summary(user_sport())
     
     if df_financial.empty:
         st.warning("⚠️ Финансовые данные не загружены")
         return
     
-    # Фильтрация по правам доступа
-    if st.session_state.user['role'] == 'curator':
-        df_athletes = df_athletes[df_athletes['sport'] == st.session_state.user['sport']]
-        df_financial = df_financial[df_financial['athlete_id'].isin(df_athletes['athlete_id'])]
-    
     # Общий бюджет
-    total_budget = df_financial['total_monthly_budget_rub'].sum()
+    total_budget = df_financial['total_budget_rub'].sum()
     st.metric("Общий ежемесячный бюджет", f"₽{total_budget:,.0f}")
     
     st.markdown("---")
     
     # Распределение по источникам
-    budget_by_source = df_financial.groupby('funding_source')['total_monthly_budget_rub'].sum()
+    budget_by_source = df_financial.groupby('funding_source')['total_budget_rub'].sum()
     
     fig = px.pie(values=budget_by_source.values, names=budget_by_source.index,
                 title='Распределение по источникам финансирования')
@@ -508,30 +909,288 @@ def show_financing():
 
 # ===== СТРАНИЦА 5: НАСТАВНИЧЕСТВО =====
 
+@instrumentation.timed(kind='page')
 def show_mentorship_page():
     """Страница наставничества"""
     st.header("👨‍🏫 Программа наставничества")
     
-    df_mentorship = load_mentorship()
+    # Куратор получает только строки своего вида спорта
+    try:
+        total = paged_total('mentorship', user_sport())
+    except Exception:
+        total = 0
     
-    if df_mentorship.empty:
+    if total == 0:
         st.warning("⚠️ Данные о наставничестве не загружены")
         return
     
     st.subheader("Наставники и подопечные")
     
-    df_display = df_mentorship[['athlete_id', 'mentor_name', 'consultation_frequency_per_month',
-                                'mentee_progress_rating_1_10', 'mentee_feedback']].copy()
-    df_display.columns = ['ID спортсмена', 'Наставник', 'Консультации/месяц',
-                          'Оценка прогресса', 'Отзыв']
+    paginated_table('mentorship',
+                    {'athlete_id': 'ID спортсмена', 'mentor_name': 'Наставник',
+                     'consultation_frequency_per_month': 'Консультации/месяц',
+                     'mentee_progress_rating_1_10': 'Оценка прогресса',
+                     'mentee_feedback': 'Отзыв'},
+                    ['mentor_name', 'mentee_progress_rating_1_10'])
+
+# ===== СТРАНИЦА 6: ДИНАМИКА ТЕСТОВ =====
+
+@instrumentation.timed(kind='page')
+def show_test_trends():
+    """Страница динамики функциональных тестов"""
+    import plotly.graph_objects as go
+    import charts
+    
+    st.header("📉 Динамика функциональных тестов")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        metric = st.selectbox("Показатель", list(analytics.TEST_METRICS),
+                              format_func=lambda m: analytics.TEST_METRICS[m][0])
+    with col2:
+        window = st.slider("Окно скользящего среднего (тестов)", *TREND_WINDOWS, 3)
+    
+    # Рейтинг считается одним проходом по всей таблице и кэшируется до изменения данных
+    df_ranking = load_test_ranking(metric, window, user_sport())
+    
+    if df_ranking.empty:
+        st.warning("⚠️ Функциональные тесты не загружены")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        gender = st.selectbox("Пол", ["Все"] + sorted(df_ranking['gender'].dropna().unique()))
+    with col2:
+        age_group = st.selectbox("Возрастная группа", ["Все"] + analytics.AGE_LABELS)
+    with col3:
+        min_tests = st.number_input("Минимум тестов", min_value=2, value=2)
+    
+    mask = df_ranking['tests'] >= min_tests
+    if gender != "Все":
+        mask &= df_ranking['gender'] == gender
+    if age_group != "Все":
+        mask &= df_ranking['age_group'] == age_group
+    df_view = df_ranking[mask]
+    
+    col1, col2 = st.columns(2)
+    col1.metric("Спортсменов с динамикой", len(df_view))
+    col2.metric("Медианный прогресс за 30 дней",
+                f"{df_view['improvement_per_30d'].median():+.2f}" if len(df_view) else "—")
+    
+    if df_view.empty:
+        st.info("ℹ️ Нет спортсменов с выбранными параметрами")
+        return
     
-    st.dataframe(df_display, use_container_width=True, hide_index=True)
+    st.subheader("Рейтинг по темпу прогресса")
+    columns = {'athlete_id': 'ID', 'full_name': 'ФИО', 'sport': 'Вид спорта',
+               'gender': 'Пол', 'age_group': 'Возраст', 'tests': 'Тестов',
+               'last_value': 'Последний', 'rolling_mean': 'Скольз. среднее',
+               'personal_best': 'Личный рекорд', 'improvement_per_30d': 'Прогресс/30 дн.',
+               'improvement_percentile': 'Процентиль прогресса',
+               'best_percentile': 'Процентиль рекорда', 'cohort_size': 'Размер когорты'}
+    st.dataframe(df_view[list(columns)].head(PAGE_SIZES[-1]).rename(columns=columns),
+                 use_container_width=True, hide_index=True)
+    
+    # Ряд выбранного спортсмена: значения, скользящее среднее и личный рекорд
+    names = dict(zip(df_view['athlete_id'], df_view['full_name']))
+    athlete_id = st.selectbox("Спортсмен", list(names)[:PICKER_LIMIT],
+                              format_func=lambda i: f"{i} - {names[i]}")
+    df_tests = load_test_history(athlete_id)
+    df_trend = charts.downsample(analytics.test_trends(df_tests, metric, window),
+                                 'test_date', metric)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df_trend['test_date'], y=df_trend[metric],
+                             mode='markers+lines', name='Результат'))
+    fig.add_trace(go.Scatter(x=df_trend['test_date'], y=df_trend['rolling_mean'],
+                             mode='lines', name='Скользящее среднее'))
+    fig.add_trace(go.Scatter(x=df_trend['test_date'], y=df_trend['personal_best'],
+                             mode='lines', name='Личный рекорд', line={'dash': 'dot'}))
+    fig.update_layout(title=f"{names[athlete_id]}: {analytics.TEST_METRICS[metric][0]}",
+                      xaxis_title='Дата теста')
+    st.plotly_chart(fig, use_container_width=True)
+
+# ===== СТРАНИЦА 7: ТРЕНИРОВОЧНЫЕ СБОРЫ =====
+
+@instrumentation.timed(kind='page')
+def show_training_camps():
+    """Страница тренировочных сборов"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    import charts
+    
+    st.header("🏕️ Тренировочные сборы")
+    
+    data = load_camp_analytics(user_sport())
+    
+    if data is None or data['intervals'].empty:
+        st.warning("⚠️ Данные о сборах не загружены")
+        return
+    
+    df_camps = data['intervals']
+    cancelled = df_camps['participation_status'] == analytics.CANCELLED_STATUS
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Сборов", int((~cancelled).sum()))
+    col2.metric("Отменено", int(cancelled.sum()))
+    col3.metric("Пересекающихся сборов", len(data['overlaps']))
+    col4.metric("Тренировочных часов", f"{data['weekly']['hours'].sum():,.0f}")
+    
+    st.markdown("---")
+    
+    # Календарь одной базы за выбранный период: на диаграмме только сборы
+    # этой локации, идущие в период (крупные базы - агрегировано, charts.timeline)
+    st.subheader("📅 Календарь сборов")
+    first_day, last_day = df_camps['start'].min().date(), df_camps['end'].max().date()
+    col1, col2 = st.columns(2)
+    with col1:
+        location = st.selectbox("База", sorted(df_camps['location'].dropna().unique()))
+    with col2:
+        period = st.date_input("Период",
+                               (max(first_day, last_day - pd.Timedelta(days=CALENDAR_DAYS)), last_day),
+                               min_value=first_day, max_value=last_day, key="camps_period")
+    # Пока выбрана только первая дата диапазона, период - до конца данных
+    period_start, period_end = (tuple(period) + (last_day,))[:2] if period else (first_day, last_day)
+    df_location = df_camps[(df_camps['location'] == location) & ~cancelled
+                           & (df_camps['start'] <= pd.Timestamp(period_end))
+                           & (df_camps['end'] >= pd.Timestamp(period_start))]
+    if df_location.empty:
+        st.info("ℹ️ На базе нет сборов в выбранный период")
+    else:
+        df_location = df_location.assign(end_exclusive=df_location['end'] + pd.Timedelta(days=1))
+        fig = charts.timeline(df_location, 'start', 'end_exclusive', 'athlete_id', 'training_focus',
+                              hover_name='camp_name',
+                              labels={'start': 'Дата', 'athlete_id': 'Спортсмен',
+                                      'training_focus': 'Направленность',
+                                      'count': 'Спортсменов на сборах'})
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Загрузка базы по дням (ступенчатая линия) и пиковая загрузка всех баз
+    df_occupancy = data['occupancy'][data['occupancy']['location'] == location]
+    fig = px.line(df_occupancy, x='date', y='athletes', line_shape='hv',
+                  title=f'Загрузка базы: {location}',
+                  labels={'date': 'Дата', 'athletes': 'Спортсменов на базе'})
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(data['capacity'].rename(columns={
+        'location': 'База', 'camps': 'Сборов', 'athletes': 'Спортсменов',
+        'peak_athletes': 'Пиковая загрузка', 'peak_date': 'Дата пика',
+        'camp_days': 'Сборо-дней'}), use_container_width=True, hide_index=True)
+    
+    # Пересечения сборов одного спортсмена
+    st.markdown("---")
+    st.subheader("⚠️ Пересекающиеся сборы")
+    if data['overlaps'].empty:
+        st.info("ℹ️ Пересечений не найдено")
+    else:
+        st.dataframe(data['overlaps'][['athlete_id', 'camp_id', 'camp_name', 'location',
+                                       'start', 'end', 'overlap_group']].rename(columns={
+            'athlete_id': 'ID спортсмена', 'camp_id': 'Сбор', 'camp_name': 'Название',
+            'location': 'База', 'start': 'Начало', 'end': 'Окончание',
+            'overlap_group': 'Группа'}), use_container_width=True, hide_index=True)
+    
+    # Недельная нагрузка: всего и нарастающим итогом по спортсмену
+    st.markdown("---")
+    st.subheader("⏱️ Тренировочная нагрузка по неделям")
+    df_weekly = data['weekly']
+    df_total = df_weekly.groupby('week', as_index=False)['hours'].sum()
+    fig = px.bar(df_total, x='week', y='hours', title='Тренировочные часы на сборах',
+                 labels={'week': 'Неделя', 'hours': 'Часов'})
+    st.plotly_chart(fig, use_container_width=True)
+    
+    athlete_id = athlete_picker('camps', "Спортсмен")
+    if athlete_id is None:
+        return
+    df_athlete = df_weekly[df_weekly['athlete_id'] == athlete_id]
+    if df_athlete.empty:
+        st.info("ℹ️ У спортсмена нет сборов")
+        return
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df_athlete['week'], y=df_athlete['hours'], name='За неделю'))
+    fig.add_trace(go.Scatter(x=df_athlete['week'], y=df_athlete['cumulative_hours'],
+                             mode='lines+markers', name='Нарастающим итогом'))
+    fig.update_layout(title=f'Нагрузка спортсмена {athlete_id}',
+                      xaxis_title='Неделя', yaxis_title='Часов')
+    st.plotly_chart(fig, use_container_width=True)
+
+# ===== СТРАНИЦА 8: ДИАГНОСТИКА (только администратор) =====
+
+def show_diagnostics():
+    """Время загрузки данных и отрисовки страниц, попадания в кэш"""
+    st.header("🩺 Диагностика производительности")
+    
+    df_metrics = instrumentation.to_dataframe()
+    
+    if df_metrics.empty:
+        st.info("ℹ️ Замеров пока нет: откройте страницы дашборда")
+        return
+    
+    cached = df_metrics[df_metrics['cache_hit_ratio'].notna()]
+    hits, misses = cached['cache_hits'].sum(), cached['cache_misses'].sum()
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Вызовов", int(df_metrics['calls'].sum()))
+    col2.metric("Попаданий в кэш", f"{hits / (hits + misses):.0%}" if hits + misses else "—")
+    col3.metric("Ошибок", int(df_metrics['errors'].sum()))
+    
+    for kind, title in [('page', "Страницы"), ('loader', "Загрузка данных")]:
+        st.subheader(title)
+        st.dataframe(df_metrics[df_metrics['kind'] == kind].drop(columns='kind')
+                     .sort_values('total_seconds', ascending=False),
+                     use_container_width=True, hide_index=True,
+                     column_config={
+                         'name': 'Функция', 'calls': 'Вызовов', 'errors': 'Ошибок',
+                         'total_seconds': st.column_config.NumberColumn('Всего, с', format='%.3f'),
+                         'mean_seconds': st.column_config.NumberColumn('Среднее, с', format='%.4f'),
+                         'max_seconds': st.column_config.NumberColumn('Макс., с', format='%.4f'),
+                         'p50_seconds': st.column_config.NumberColumn('p50, с', format='%.4f'),
+                         'p95_seconds': st.column_config.NumberColumn('p95, с', format='%.4f'),
+                         'p99_seconds': st.column_config.NumberColumn('p99, с', format='%.4f'),
+                         'rows': 'Строк', 'last_bytes': 'Байт (последний)',
+                         'cache_hits': 'Попаданий', 'cache_misses': 'Промахов',
+                         'cache_hit_ratio': st.column_config.NumberColumn('Доля попаданий',
+                                                                          format='%.2f'),
+                     })
+    
+    st.subheader("Память таблиц в кэше")
+    st.dataframe(frames.memory_report(), use_container_width=True, hide_index=True)
+    
+    snap = open_snapshot()
+    if snap is None:
+        st.caption("Снимок Arrow не найден: таблицы читаются из БД (`python snapshot.py`)")
+    else:
+        versions = queries.table_versions()
+        stale = snap.stale_tables(versions)
+        stale_slices = snap.stale_slices(versions)
+        st.caption(f"Снимок Arrow `{snap.directory}`: {snap.nbytes / 2**20:.1f} МБ в памяти, "
+                   + (f"устарели: {', '.join(stale)} (читаются из БД)" if stale else "все таблицы актуальны")
+                   + (f"; выборки кураторов из БД: {', '.join(stale_slices)}" if stale_slices else ""))
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("⬇️ JSON", instrumentation.to_json(),
+                           file_name="metrics.json", mime="application/json")
+    with col2:
+        st.download_button("⬇️ Prometheus", instrumentation.to_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+    with col3:
+        if st.button("🔄 Сбросить замеры"):
+            instrumentation.reset()
+            st.rerun()
 
 # ===== ГЛАВНАЯ ФУНКЦИЯ =====
 
 def main():
     """Главная функция приложения"""
     
+    try:
+        init_database()
+    except Exception as e:
+        st.error(f"❌ Ошибка миграции БД: {e}")
+    
+    start_warm_up()
+    
     # Инициализация сессии
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
@@ -0,0 +1,17 @@
+# Olympic Reserve - Учетные записи и проверка пароля
+# Общие для дашборда (app.py), HTTP API и нагрузочного теста: модуль
+# не зависит от Streamlit.
+
+# ===== МОКИРОВАННЫЕ УЧЕТНЫЕ ДАННЫЕ =====
+USERS = {
+    'admin': {'password': 'admin123', 'role': 'admin', 'sport': None},
+    'curator_rowing': {'password': 'curator123', 'role': 'curator', 'sport': 'Гребля'},
+    'curator_skiing': {'password': 'curator123', 'role': 'curator', 'sport': 'Лыжные гонки'},
+    'curator_biathlon': {'password': 'curator123', 'role': 'curator', 'sport': 'Биатлон'},
+}
+
+def authenticate(username, password):
+    """Проверить учетные данные. Возвращает запись пользователя или None"""
+    if username in USERS and USERS[username]['password'] == password:
+        return USERS[username]
+    return None
@@ -0,0 +1,496 @@
+# Olympic Reserve - Нагрузочный тест на синтетическом реестре
+# Генерирует БД той же схемы заданного масштаба и замеряет загрузчики данных,
+# страницы дашборда (без браузера, через streamlit.testing AppTest) и выгрузку
+# паспортов. Результат - JSON-отчет, который можно сравнить с предыдущим.
+# Запуск из командной строки:
+#   python benchmark.py --athletes 10000 --out bench_10k.json
+#   python benchmark.py --athletes 100000 --db /tmp/bench.db --reuse --compare bench_old.json
+#   python benchmark.py --athletes 1000000 --generate-only --db /data/bench_1m.db
+
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import db
+import frames
+import instrumentation
+import migrations
+import queries
+import reports
+
+GENERATE_CHUNK = 50000     # спортсменов на пакет генерации
+REPEAT = 3                 # повторов каждого замера (в отчет идет медиана)
+PDF_ATHLETES = 200         # паспортов в замере выгрузки
+REGRESSION_THRESHOLD = 0.2 # замедление больше 20% считается регрессией
+MIN_COMPARED_SECONDS = 0.01  # более быстрые замеры не сравниваются (шум)
+
+# Записей на спортсмена (среднее) - как в olympic_reserve.db
+ROWS_PER_ATHLETE = {
+    'medical_records': 2.6,
+    'functional_tests': 3.0,
+    'psychological_records': 1,
+    'financial_records': 1,
+    'mentorship': 1,
+    'training_camps': 2.5,
+}
+ATHLETES_PER_MENTOR = 9
+
+SPORTS = {
+    'Гребля': ('Федерация гребного спорта России',
+               ['Санкт-Петербург', 'Крылатское (Москва)', 'Рязань']),
+    'Лыжные гонки': ('Федерация лыжных гонок России',
+                     ['Югра (Ханты-Мансийск)', 'Сыктывкар', 'Чебоксары']),
+    'Биатлон': ('Федерация биатлона России',
+                ['Ямало-Ненецкий АО', 'Сноу-парк Чегет', 'Клёцк (Беларусь)']),
+}
+COACHES = ['Алексей Морозов', 'Иван Сергеев', 'Петр Новиков', 'Ольга Васильева',
+           'Наталья Громова', 'Анна Петрова', 'Сергей Смирнов', 'Виктор Козлов']
+FUNDING_SOURCES = ['Бюджет федерации', 'Бюджет ОКР', 'Российский спортивный фонд', 'Спонсорство']
+TEST_TYPES = ['Мощность в Вт', 'Анаэробный порог', 'Тест на выносливость',
+              'Максимальное потребление кислорода (VO2max)']
+TEST_NOTES = ['Хороший результат', 'Необходимо улучшение', 'Отличный результат', 'Результат в норме']
+PSYCH_NOTES = ['Отличная психологическая адаптация', 'Хорошая психологическая готовность',
+               'Необходимо развивать устойчивость к стрессу', 'Высокий уровень мотивации']
+FEEDBACK = ['Хороший прогресс', 'Положительный прогресс', 'Отличный результат', 'Требуется улучшение']
+TRAINING_FOCUS = ['Адаптационный период', 'Специальная подготовка',
+                  'Общая физическая подготовка', 'Техническая подготовка']
+
+# ===== ГЕНЕРАЦИЯ БД =====
+
+def _dates(rng, start, end, size):
+    """Случайные даты ГГГГ-ММ-ДД в диапазоне [start, end]"""
+    start, end = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    days = rng.integers(0, (end - start).astype(int) + 1, size)
+    return np.datetime_as_string(start + days, unit='D')
+
+def _ids(prefix, start, count, width=8):
+    return [f'{prefix}{i:0{width}d}' for i in range(start, start + count)]
+
+def _repeat(rng, athlete_ids, mean):
+    """Индексы спортсменов для дочерней таблицы: в среднем mean строк на спортсмена"""
+    if mean == 1:
+        return np.arange(len(athlete_ids))
+    counts = rng.poisson(mean - 1, len(athlete_ids)) + 1
+    return np.repeat(np.arange(len(athlete_ids)), counts)
+
+def _insert(conn, table, columns):
+    """Вставить столбцы {имя: массив} одним executemany"""
+    names = list(columns)
+    values = [np.asarray(columns[name]).tolist() for name in names]
+    conn.executemany(f'INSERT INTO {table} ({", ".join(names)}) VALUES '
+                     f'({", ".join("?" for _ in names)})', zip(*values))
+
+def _generate_mentors(conn, rng, count):
+    sports = np.array(list(SPORTS))[rng.integers(0, len(SPORTS), count)]
+    # Хотя бы один наставник на вид спорта
+    sports[:len(SPORTS)] = list(SPORTS)
+    ids = np.array(_ids('MENTOR', 1, count, 6))
+    _insert(conn, 'mentors', {
+        'mentor_id': ids,
+        'full_name': [f'Наставник {i}' for i in range(1, count + 1)],
+        'sport': sports,
+        'olympian': rng.integers(0, 2, count),
+        'medals': rng.integers(0, 6, count),
+    })
+    return {sport: ids[sports == sport] for sport in SPORTS}
+
+def _generate_chunk(conn, rng, start, count, mentors):
+    """Спортсмены start..start+count и их записи во всех дочерних таблицах"""
+    ids = np.array(_ids('ATH', start, count))
+    gender = rng.choice(['М', 'Ж'], count)
+    male = gender == 'М'
+    sport = np.array(list(SPORTS))[rng.integers(0, len(SPORTS), count)]
+    age = rng.integers(12, 23, count)
+    height = np.round(np.where(male, rng.normal(182, 7, count), rng.normal(170, 6, count)), 1)
+    weight = np.round(height - 100 + rng.normal(0, 5, count), 1)
+    body_fat = np.round(rng.uniform(8, 25, count), 1)
+    vo2 = np.round(rng.normal(55, 6, count), 1)
+
+    _insert(conn, 'athletes', {
+        'athlete_id': ids,
+        'full_name': [f'Спортсмен {i}' for i in range(start, start + count)],
+        'gender': gender,
+        'age': age,
+        'date_of_birth': _dates(rng, '2003-01-01', '2013-12-31', count),
+        'sport': sport,
+        'federation': [SPORTS[s][0] for s in sport],
+        'personal_coach': rng.choice(COACHES, count),
+        'height_cm': height,
+        'weight_kg': weight,
+        'body_fat_percent': body_fat,
+        'muscle_mass_percent': np.round(rng.uniform(35, 50, count), 1),
+        'vo2_max_ml_kg_min': vo2,
+        'heart_rate_peak_bpm': rng.integers(185, 211, count),
+        'resting_heart_rate_bpm': rng.integers(42, 71, count),
+        'training_experience_years': rng.integers(1, 11, count),
+        'reserve_level': rng.choice(['Основной пул', 'Расширенный пул'], count),
+        'enrollment_date': _dates(rng, '2020-01-01', '2025-10-31', count),
+        'status': rng.choice(['Активен', 'В отпуске'], count, p=[0.9, 0.1]),
+        'rating_position': np.arange(start, start + count),
+    })
+
+    rows = _repeat(rng, ids, ROWS_PER_ATHLETE['medical_records'])
+    n = len(rows)
+    _insert(conn, 'medical_records', {
+        'medical_record_id': _ids('MED', start * 10, n, 9),
+        'athlete_id': ids[rows],
+        'exam_date': _dates(rng, '2024-01-01', '2025-11-15', n),
+        'height_cm': height[rows],
+        'weight_kg': np.round(weight[rows] + rng.normal(0, 1.5, n), 1),
+        'body_fat_percent': np.round(body_fat[rows] + rng.normal(0, 1, n), 1),
+        'bmi': np.round(weight[rows] / (height[rows] / 100) ** 2, 1),
+        'resting_heart_rate': rng.integers(42, 71, n),
+        'max_heart_rate': rng.integers(185, 211, n),
+        'vo2_peak_ml_kg_min': np.round(vo2[rows] + rng.normal(0, 1.5, n), 1),
+        'systolic_blood_pressure': rng.integers(105, 135, n),
+        'diastolic_blood_pressure': rng.integers(65, 90, n),
+        'fasting_glucose_mg_dl': np.round(rng.uniform(70, 100, n), 1),
+        'hemoglobin_g_dl': np.round(rng.uniform(12, 17, n), 1),
+        'hematocrit_percent': np.round(rng.uniform(38, 50, n), 1),
+        'health_status': rng.choice(['Здоров', 'Требует наблюдения'], n, p=[0.85, 0.15]),
+        'medical_clearance': rng.choice(['Разрешено', 'Ограничено'], n, p=[0.9, 0.1]),
+    })
+
+    rows = _repeat(rng, ids, ROWS_PER_ATHLETE['functional_tests'])
+    n = len(rows)
+    _insert(conn, 'functional_tests', {
+        'test_id': _ids('TEST', start * 10, n, 9),
+        'athlete_id': ids[rows],
+        'test_date': _dates(rng, '2024-01-01', '2025-11-15', n),
+        'test_type': rng.choice(TEST_TYPES, n),
+        'vo2_max_ml_kg_min': np.round(vo2[rows] + rng.normal(0, 2, n), 1),
+        'anaerobic_threshold_percent': np.round(rng.uniform(70, 90, n), 1),
+        'peak_power_watts': np.round(rng.normal(900, 150, n), 1),
+        'performance_time_seconds': rng.integers(240, 420, n),
+        'distance_covered_m': np.round(rng.uniform(5000, 12000, n), 1),
+        'notes': rng.choice(TEST_NOTES, n),
+    })
+
+    _insert(conn, 'psychological_records', {
+        'psych_record_id': _ids('PSY', start, count),
+        'athlete_id': ids,
+        'assessment_date': _dates(rng, '2025-01-01', '2025-11-15', count),
+        **{column: rng.integers(3, 11, count) for column in (
+            'motivation_level_1_10', 'stress_resilience_1_10', 'anxiety_level_1_10',
+            'self_confidence_1_10', 'concentration_ability_1_10', 'team_cooperation_1_10',
+            'recovery_rate_1_10')},
+        'overall_psychological_score_1_100': rng.integers(40, 100, count).astype(float),
+        'psychologist_notes': rng.choice(PSYCH_NOTES, count),
+    })
+
+    budgets = {column: rng.integers(low, high, count) for column, low, high in (
+        ('monthly_stipend_rub', 0, 50000), ('equipment_budget_rub', 50000, 150000),
+        ('accommodation_budget_rub', 20000, 60000), ('training_camp_budget_rub', 80000, 200000),
+        ('medical_services_budget_rub', 10000, 50000),
+        ('psychological_services_budget_rub', 10000, 40000))}
+    _insert(conn, 'financial_records', {
+        'finance_record_id': _ids('FIN', start, count),
+        'athlete_id': ids,
+        'record_date': _dates(rng, '2025-01-01', '2025-11-15', count),
+        **budgets,
+        'total_monthly_budget_rub': sum(budgets.values()),
+        'funding_source': rng.choice(FUNDING_SOURCES, count),
+    })
+
+    mentor_ids = np.empty(count, dtype=object)
+    for name, candidates in mentors.items():
+        mask = sport == name
+        mentor_ids[mask] = candidates[rng.integers(0, len(candidates), mask.sum())]
+    _insert(conn, 'mentorship', {
+        'mentorship_id': _ids('MENT', start, count),
+        'athlete_id': ids,
+        'mentor_id': mentor_ids,
+        'mentor_name': [f'Наставник {int(m[6:])}' for m in mentor_ids],
+        'program_start_date': _dates(rng, '2024-01-01', '2025-06-30', count),
+        'consultation_frequency_per_month': rng.integers(1, 6, count),
+        'last_consultation_date': _dates(rng, '2025-07-01', '2025-11-15', count),
+        'mentee_progress_rating_1_10': rng.integers(4, 11, count),
+        'mentee_feedback': rng.choice(FEEDBACK, count),
+    })
+
+    rows = _repeat(rng, ids, ROWS_PER_ATHLETE['training_camps'])
+    n = len(rows)
+    camp_sport = sport[rows]
+    camp_number = rng.integers(1, 4, n)
+    start_dates = np.datetime64('2025-01-01') + rng.integers(0, 320, n)
+    duration = rng.integers(7, 22, n)
+    _insert(conn, 'training_camps', {
+        'camp_id': _ids('CAMP', start * 10, n, 9),
+        'athlete_id': ids[rows],
+        'camp_name': [f'{s} - сбор {k}' for s, k in zip(camp_sport, camp_number)],
+        'location': [SPORTS[s][1][k - 1] for s, k in zip(camp_sport, camp_number)],
+        'start_date': np.datetime_as_string(start_dates, unit='D'),
+        'end_date': np.datetime_as_string(start_dates + duration - 1, unit='D'),
+        'duration_days': duration,
+        'training_focus': rng.choice(TRAINING_FOCUS, n),
+        'average_daily_training_hours': np.round(rng.uniform(3, 7.5, n), 1),
+        'participation_status': rng.choice(['Завершен', 'Отменен'], n, p=[0.8, 0.2]),
+        'improvement_rating_1_10': rng.integers(4, 11, n),
+    })
+
+def generate(db_path, athletes, seed=0, verbose=False):
+    """Создать синтетическую БД: athletes спортсменов и пропорциональные записи.
+
+    Таблицы заполняются без индексов и триггеров (пакетами по
+    GENERATE_CHUNK спортсменов), затем migrations.migrate строит ключи,
+    индексы, сводные таблицы и поиск - как при обновлении рабочей БД.
+    """
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    try:
+        for create_sql in migrations.TABLE_SCHEMAS.values():
+            conn.execute(create_sql)
+        mentors = _generate_mentors(conn, rng, max(len(SPORTS), athletes // ATHLETES_PER_MENTOR))
+        for start in range(1, athletes + 1, GENERATE_CHUNK):
+            count = min(GENERATE_CHUNK, athletes + 1 - start)
+            _generate_chunk(conn, rng, start, count, mentors)
+            conn.commit()
+            if verbose:
+                print(f'  спортсменов: {start + count - 1:,} / {athletes:,}')
+    finally:
+        conn.close()
+
+    migrations.migrate(db_path, verbose=verbose)
+
+def table_counts(db_path):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in db.TABLES}
+    finally:
+        conn.close()
+
+# ===== ЗАМЕРЫ =====
+
+def _measure(func, repeat=REPEAT):
+    """Медиана и минимум времени выполнения func() в секундах"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(times), 'min_seconds': min(times), 'runs': repeat}
+
+def _use_database(db_path):
+    """Переключить слой доступа к данным (и app.py) на файл БД бенчмарка"""
+    os.environ['OLYMPIC_RESERVE_DB'] = db_path
+    db.DB_NAME = db_path
+    db.close_pools()
+
+def bench_loaders(repeat=REPEAT, sport=None):
+    """Запросы и расчеты, которые выполняют загрузчики app.py (без кэша Streamlit)"""
+    suffix = f'[{sport}]' if sport else ''
+    results = {}
+    for table in db.TABLES:
+        results[f'load:{table}{suffix}'] = _measure(
+            lambda: frames.compact(queries.scoped_table(table, sport), table), repeat)
+
+    results[f'summary:athletes{suffix}'] = _measure(lambda: queries.athlete_summary(sport), repeat)
+    results[f'summary:finance{suffix}'] = _measure(lambda: queries.finance_summary(sport), repeat)
+
+    total = queries.paged_count('athletes', sport)
+    results[f'paged:athletes:first{suffix}'] = _measure(
+        lambda: queries.paged_rows('athletes', sport, limit=50, offset=0), repeat)
+    results[f'paged:athletes:last{suffix}'] = _measure(
+        lambda: queries.paged_rows('athletes', sport, limit=50, offset=max(total - 50, 0)), repeat)
+    results[f'paged:athletes:search{suffix}'] = _measure(
+        lambda: queries.paged_count('athletes', sport, search='спортсмен 12'), repeat)
+    results[f'search:athletes{suffix}'] = _measure(
+        lambda: queries.search_athletes('Спортсмен 12', sport), repeat)
+
+    tests = frames.compact(queries.scoped_table('functional_tests', sport), 'functional_tests')
+    athletes = frames.compact(queries.scoped_table('athletes', sport), 'athletes')
+    camps = frames.compact(queries.scoped_table('training_camps', sport), 'training_camps')
+    results[f'analytics:test_ranking{suffix}'] = _measure(
+        lambda: analytics.improvement_ranking(tests, athletes, 'vo2_max_ml_kg_min'), repeat)
+    results[f'analytics:camp_overlaps{suffix}'] = _measure(
+        lambda: analytics.camp_overlaps(camps), repeat)
+    results[f'analytics:weekly_hours{suffix}'] = _measure(
+        lambda: analytics.weekly_training_hours(camps), repeat)
+    results[f'analytics:location_capacity{suffix}'] = _measure(
+        lambda: analytics.location_capacity(camps), repeat)
+
+    if sport is None:
+        results['analytics:cohort_index'] = _measure(
+            lambda: analytics.CohortIndex(queries.cohort_metrics()), repeat)
+        index = analytics.CohortIndex(queries.cohort_metrics())
+        athlete = queries.get_athlete(athletes['athlete_id'].iloc[0])
+        results['analytics:cohort_lookup'] = _measure(
+            lambda: index.profile(athlete), repeat)
+    return results
+
+def bench_pages(users=('admin', 'curator_rowing')):
+    """Время каждой страницы дашборда: первый заход (холодный кэш) и повторный"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import auth
+
+    # Фоновый прогрев заполнил бы кэш до "холодного" захода
+    os.environ['OLYMPIC_RESERVE_WARMUP'] = '0'
+    app_path = os.path.join(db.BASE_DIR, 'app.py')
+    results = {}
+    for username in users:
+        at = AppTest.from_file(app_path, default_timeout=600)
+        at.session_state.logged_in = True
+        at.session_state.user = auth.USERS[username]
+        at.run()
+        for page in at.sidebar.radio[0].options:
+            for attempt in ('cold', 'warm'):
+                if attempt == 'cold':
+                    # И ресурсы (индекс когорт, снимок Arrow); init_database
+                    # повторится, но без новых миграций ничего не делает
+                    st.cache_data.clear()
+                    st.cache_resource.clear()
+                start = time.perf_counter()
+                at.sidebar.radio[0].set_value(page).run()
+                seconds = time.perf_counter() - start
+                errors = [e.value for e in at.error] + [e.message for e in at.exception]
+                results[f'page:{username}:{page}:{attempt}'] = {
+                    'seconds': seconds, 'min_seconds': seconds, 'runs': 1,
+                    **({'errors': errors} if errors else {})}
+    return results
+
+def bench_pdf(count=PDF_ATHLETES, repeat=1):
+    """Пакетная выгрузка паспортов в ZIP: в одном процессе и на всех ядрах"""
+    athlete_ids = reports.select_athlete_ids()[:count]
+    return {
+        f'pdf:zip:{len(athlete_ids)}:single': _measure(
+            lambda: reports.export_passports_zip(athlete_ids, io.BytesIO(), workers=1), repeat),
+        f'pdf:zip:{len(athlete_ids)}:parallel': _measure(
+            lambda: reports.export_passports_zip(athlete_ids, io.BytesIO()), repeat),
+    }
+
+# ===== ОТЧЕТ =====
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=db.BASE_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(db_path, athletes, repeat=REPEAT, pdf=PDF_ATHLETES, pages=True, reuse=False, seed=0):
+    """Сгенерировать БД (если нужно) и выполнить все замеры. Возвращает отчет (dict)"""
+    if not (reuse and os.path.exists(db_path)):
+        start = time.perf_counter()
+        generate(db_path, athletes, seed=seed, verbose=True)
+        print(f'✅ БД сгенерирована за {time.perf_counter() - start:.1f} с')
+    _use_database(db_path)
+
+    results = {}
+    print('→ Загрузчики данных')
+    results.update(bench_loaders(repeat))
+    results.update(bench_loaders(repeat, sport=next(iter(SPORTS))))
+    if pages:
+        print('→ Страницы (AppTest)')
+        instrumentation.reset()
+        results.update(bench_pages())
+    if pdf:
+        print('→ Выгрузка паспортов')
+        results.update(bench_pdf(pdf))
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'athletes': athletes,
+            'rows': table_counts(db_path),
+            'db_bytes': os.path.getsize(db_path),
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+        'instrumentation': instrumentation.snapshot(),
+    }
+
+def compare(report, previous, threshold=REGRESSION_THRESHOLD):
+    """Сравнить замеры с предыдущим отчетом: [(имя, было, стало, отношение, регрессия)]"""
+    rows = []
+    for name, result in report['results'].items():
+        old = previous.get('results', {}).get(name)
+        if old is None:
+            continue
+        before, after = old['seconds'], result['seconds']
+        ratio = after / before if before else float('inf')
+        regression = ratio > 1 + threshold and max(before, after) >= MIN_COMPARED_SECONDS
+        rows.append((name, before, after, ratio, regression))
+    return rows
+
+def print_report(report):
+    print(f"\nСпортсменов: {report['meta']['athletes']:,}, строк: "
+          + ', '.join(f'{t}={n:,}' for t, n in report['meta']['rows'].items()))
+    for name, result in report['results'].items():
+        mark = ' ⚠️ ' + '; '.join(result['errors']) if result.get('errors') else ''
+        print(f"{result['seconds'] * 1000:10.1f} мс  {name}{mark}")
+
+# ===== КОМАНДНАЯ СТРОКА =====
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест Olympic Reserve на синтетической БД')
+    parser.add_argument('--athletes', type=int, default=10000, help='число спортсменов')
+    parser.add_argument('--db', default=None, help='путь к БД (по умолчанию - временный файл)')
+    parser.add_argument('--reuse', action='store_true', help='не пересоздавать существующую --db')
+    parser.add_argument('--generate-only', action='store_true', help='только сгенерировать БД')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='повторов каждого замера')
+    parser.add_argument('--pdf', type=int, default=PDF_ATHLETES, help='паспортов в замере (0 - пропустить)')
+    parser.add_argument('--skip-pages', action='store_true', help='не замерять страницы')
+    parser.add_argument('--out', help='путь к JSON-отчету')
+    parser.add_argument('--compare', help='предыдущий JSON-отчет для сравнения')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='допустимое замедление (доля)')
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f'olympic_bench_{args.athletes}.db')
+    if args.generate_only:
+        generate(db_path, args.athletes, seed=args.seed, verbose=True)
+        print(f'✅ {db_path}: ' + ', '.join(f'{t}={n:,}' for t, n in table_counts(db_path).items()))
+        return 0
+
+    report = run(db_path, args.athletes, repeat=args.repeat, pdf=args.pdf,
+                 pages=not args.skip_pages, reuse=args.reuse, seed=args.seed)
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'✅ Отчет: {args.out}')
+
+    failed = any(result.get('errors') for result in report['results'].values())
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        rows = compare(report, previous, args.threshold)
+        print(f"\nСравнение с {args.compare} (коммит {previous['meta'].get('commit')}):")
+        for name, before, after, ratio, regression in rows:
+            mark = '  ⚠️ регрессия' if regression else ''
+            print(f'{before * 1000:10.1f} → {after * 1000:10.1f} мс  ×{ratio:5.2f}  {name}{mark}')
+        failed = failed or any(row[4] for row in rows)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    # Выгрузка паспортов запускает процессы через spawn - код выше импортируется повторно
+    sys.exit(main())
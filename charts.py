@@ -0,0 +1,163 @@
+# Olympic Reserve - Графики для больших реестров
+# Объем данных, передаваемых в браузер, ограничен независимо от числа строк:
+# - точечные графики переходят на WebGL (Scattergl), а выше MAX_POINTS
+#   точки агрегируются в ячейки сетки (размер маркера = число спортсменов);
+# - гистограммы считаются на сервере (np.histogram), в браузер уходят столбцы;
+# - временные ряды прореживаются алгоритмом LTTB;
+# - календари (px.timeline) выше TIMELINE_MAX_BARS полос сворачиваются в
+#   число занятых по дням, ступенчато по значениям color.
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = int(os.environ.get('OLYMPIC_RESERVE_WEBGL_THRESHOLD', '2000'))
+MAX_POINTS = int(os.environ.get('OLYMPIC_RESERVE_MAX_POINTS', '10000'))
+TIMELINE_MAX_BARS = int(os.environ.get('OLYMPIC_RESERVE_TIMELINE_MAX_BARS', '500'))
+GRID_BINS = 60             # ячеек по каждой оси при агрегации точек
+MAX_MARKER_SIZE = 30
+
+# ===== ТОЧЕЧНЫЕ ГРАФИКИ =====
+
+def _grid_aggregate(df, x, y):
+    """Точки -> центры непустых ячеек сетки GRID_BINS × GRID_BINS и число точек"""
+    data = df[[x, y]].dropna().to_numpy(dtype='float64')
+    if len(data) == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+    counts, x_edges, y_edges = np.histogram2d(data[:, 0], data[:, 1], bins=GRID_BINS)
+    ix, iy = np.nonzero(counts)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return x_centers[ix], y_centers[iy], counts[ix, iy]
+
+def scatter(df, x, y, color=None, size=None, hover_name=None, title=None, labels=None):
+    """Точечный график с ограниченным объемом данных.
+
+    До WEBGL_THRESHOLD точек - обычный px.scatter (SVG), до MAX_POINTS -
+    WebGL, больше - агрегированные ячейки сетки по каждому значению color.
+    """
+    labels = labels or {}
+    if len(df) <= MAX_POINTS:
+        render_mode = 'svg' if len(df) <= WEBGL_THRESHOLD else 'webgl'
+        return px.scatter(df, x=x, y=y, color=color, size=size, hover_name=hover_name,
+                          title=title, labels=labels, render_mode=render_mode)
+
+    groups = df.groupby(color, observed=True) if color else [(None, df)]
+    fig = go.Figure()
+    for name, group in groups:
+        gx, gy, counts = _grid_aggregate(group, x, y)
+        fig.add_trace(go.Scattergl(
+            x=gx, y=gy, mode='markers', name=str(name) if name is not None else 'Все',
+            customdata=counts,
+            hovertemplate=f'{labels.get(x, x)}: %{{x:.1f}}<br>{labels.get(y, y)}: %{{y:.1f}}'
+                          '<br>Спортсменов: %{customdata:.0f}<extra></extra>',
+            marker={'size': counts, 'sizemode': 'area', 'sizemin': 3,
+                    'sizeref': 2 * counts.max() / MAX_MARKER_SIZE ** 2 if len(counts) else 1,
+                    'opacity': 0.7},
+        ))
+    fig.update_layout(title=f'{title} (агрегировано: {len(df):,} точек)' if title else None,
+                      xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+                      legend_title_text=labels.get(color, color))
+    return fig
+
+# ===== ГИСТОГРАММЫ =====
+
+def histogram(df, x, color=None, nbins=10, title=None, labels=None):
+    """Гистограмма, посчитанная на сервере: в браузер уходят только столбцы.
+
+    Границы интервалов общие для всех значений color (столбцы складываются).
+    """
+    labels = labels or {}
+    values = df[x].dropna().to_numpy(dtype='float64')
+    edges = np.histogram_bin_edges(values, bins=nbins) if len(values) else np.array([0.0, 1.0])
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
+
+    groups = df.groupby(color, observed=True) if color else [(None, df)]
+    fig = go.Figure()
+    for name, group in groups:
+        counts, _ = np.histogram(group[x].dropna().to_numpy(dtype='float64'), bins=edges)
+        fig.add_trace(go.Bar(x=centers, y=counts, width=widths,
+                             name=str(name) if name is not None else labels.get(x, x)))
+    fig.update_layout(barmode='stack', bargap=0, title=title,
+                      xaxis_title=labels.get(x, x), yaxis_title=labels.get('count', 'count'),
+                      legend_title_text=labels.get(color, color))
+    return fig
+
+# ===== КАЛЕНДАРИ =====
+
+def timeline(df, x_start, x_end, y, color, hover_name=None, title=None, labels=None):
+    """Календарь интервалов [x_start, x_end) с ограниченным числом полос.
+
+    До TIMELINE_MAX_BARS интервалов - px.timeline (полоса на интервал),
+    больше - число интервалов, идущих в каждый день, по значениям color
+    (ступенчатые области с накоплением).
+    """
+    labels = labels or {}
+    if len(df) <= TIMELINE_MAX_BARS:
+        fig = px.timeline(df, x_start=x_start, x_end=x_end, y=y, color=color,
+                          hover_name=hover_name, title=title, labels=labels)
+        fig.update_yaxes(autorange='reversed')
+        return fig
+
+    groups = df[color].astype('object').where(df[color].notna(), '—')
+    events = pd.concat([
+        pd.DataFrame({'group': groups, 'date': df[x_start].dt.normalize(), 'delta': 1}),
+        pd.DataFrame({'group': groups, 'date': df[x_end].dt.normalize(), 'delta': -1}),
+    ])
+    daily = events.pivot_table(index='date', columns='group', values='delta', aggfunc='sum')
+    days = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    daily = daily.reindex(days, fill_value=0).fillna(0).cumsum()
+
+    fig = go.Figure()
+    for group in daily.columns:
+        fig.add_trace(go.Scatter(x=daily.index, y=daily[group], name=str(group), mode='lines',
+                                 line_shape='hv', stackgroup='timeline'))
+    fig.update_layout(title=f'{title} (агрегировано: {len(df):,} интервалов)' if title
+                      else f'Агрегировано: {len(df):,} интервалов',
+                      xaxis_title=labels.get(x_start, x_start), yaxis_title=labels.get('count', 'count'),
+                      legend_title_text=labels.get(color, color))
+    return fig
+
+# ===== ВРЕМЕННЫЕ РЯДЫ =====
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """Индексы точек ряда после прореживания Largest-Triangle-Three-Buckets.
+
+    Сохраняет форму ряда (пики и провалы): из каждой корзины выбирается
+    точка с наибольшей площадью треугольника с соседними корзинами.
+    x - числа или datetime64, отсортированные по возрастанию.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    x = x.astype('int64').astype('float64') if np.issubdtype(x.dtype, np.datetime64) \
+        else x.astype('float64')
+    y = np.asarray(y, dtype='float64')
+
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    selected = np.empty(threshold, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = bucket_edges[i], bucket_edges[i + 1]
+        next_stop = bucket_edges[i + 2] if i + 2 < len(bucket_edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(area)) if len(area) else start
+        selected[i + 1] = previous
+    return selected
+
+def downsample(df, x, y, threshold=MAX_POINTS):
+    """Строки df, оставшиеся после LTTB по столбцам x и y"""
+    if len(df) <= threshold:
+        return df
+    df = df.dropna(subset=[x, y]).sort_values(x)
+    return df.iloc[lttb(df[x].to_numpy(), df[y].to_numpy(), threshold)]
@@ -0,0 +1,207 @@
+# Olympic Reserve - Слой доступа к данным
+# Пул соединений SQLite только для чтения + соединение для записи
+# Используется app.py и вспомогательными утилитами (миграции, загрузка данных)
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+# ===== КОНФИГУРАЦИЯ =====
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.environ.get('OLYMPIC_RESERVE_DB', os.path.join(BASE_DIR, 'olympic_reserve.db'))
+
+POOL_SIZE = int(os.environ.get('OLYMPIC_RESERVE_POOL_SIZE', '16'))
+POOL_TIMEOUT = 30          # секунд ожидания свободного соединения
+BUSY_TIMEOUT_MS = 5000     # ожидание снятия блокировки записи
+STATEMENT_CACHE = 256      # подготовленных выражений на соединение
+
+TABLES = (
+    'athletes',
+    'medical_records',
+    'functional_tests',
+    'psychological_records',
+    'financial_records',
+    'mentors',
+    'mentorship',
+    'training_camps',
+)
+
+# Настройки для дашборда: только чтение, большой кэш страниц и mmap
+READ_PRAGMAS = (
+    'PRAGMA query_only = ON',
+    'PRAGMA mmap_size = 268435456',   # 256 МБ
+    'PRAGMA cache_size = -65536',     # 64 МБ
+    'PRAGMA temp_store = MEMORY',
+    f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+)
+
+# ===== ПУЛ СОЕДИНЕНИЙ =====
+
+def casefold(value):
+    """SQL-функция casefold(): регистронезависимое сравнение для Unicode"""
+    return value.casefold() if isinstance(value, str) else value
+
+class ConnectionPool:
+    """Ограниченный пул соединений SQLite только для чтения.
+
+    Streamlit выполняет каждый перезапуск скрипта в новом потоке, поэтому
+    соединения не привязываются к потоку: соединение выдается одному потоку
+    на время запроса и возвращается в пул (check_same_thread=False безопасен,
+    так как одновременно соединением пользуется только один поток).
+    """
+
+    def __init__(self, db_path=DB_NAME, max_size=POOL_SIZE):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        enable_wal(db_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f'file:{self.db_path}?mode=ro',
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        # Встроенные lower()/LIKE в SQLite не различают регистр кириллицы
+        conn.create_function('casefold', 1, casefold, deterministic=True)
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Пул соединений закрыт')
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f'Нет свободных соединений с БД за {POOL_TIMEOUT} с')
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Взять соединение из пула на время блока with"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Закрыть все свободные соединения (занятые закроются при возврате)"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    """Получить общий пул соединений для файла БД"""
+    db_path = db_path or DB_NAME
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
+
+def close_pools():
+    """Закрыть все пулы (например, перед перестройкой файла БД)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+# ===== ЗАПРОСЫ =====
+
+def read_sql(sql, params=(), db_path=None):
+    """Выполнить запрос и вернуть DataFrame"""
+    with get_pool(db_path).connection() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+def fetch_one(sql, params=(), db_path=None):
+    """Выполнить запрос и вернуть первую строку (sqlite3.Row) или None"""
+    with get_pool(db_path).connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+def fetch_all(sql, params=(), db_path=None):
+    """Выполнить запрос и вернуть список строк sqlite3.Row"""
+    with get_pool(db_path).connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def read_table(table, db_path=None):
+    """Загрузить таблицу целиком"""
+    if table not in TABLES:
+        raise ValueError(f'Неизвестная таблица: {table}')
+    return read_sql(f'SELECT * FROM {table}', db_path=db_path)
+
+# ===== ЗАПИСЬ =====
+
+def enable_wal(db_path=None):
+    """Перевести БД в режим WAL, чтобы чтение не блокировалось записью"""
+    db_path = db_path or DB_NAME
+    if not os.path.exists(db_path):
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        if mode.lower() != 'wal':
+            conn.execute('PRAGMA journal_mode = WAL')
+    except sqlite3.OperationalError:
+        # Файл только для чтения - работаем в текущем режиме журнала
+        pass
+    finally:
+        conn.close()
+
+@contextmanager
+def write_connection(db_path=None):
+    """Соединение для записи: одна транзакция на блок with"""
+    conn = sqlite3.connect(db_path or DB_NAME, cached_statements=STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA foreign_keys = ON')
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,117 @@
+# Olympic Reserve - Компактное представление таблиц в памяти
+# Категориальные строки, уменьшенные числовые типы, даты datetime64,
+# по желанию - строки на Arrow (OLYMPIC_RESERVE_ARROW=1, нужен pyarrow;
+# в pandas 3 строки по умолчанию уже хранятся в Arrow).
+# Запуск: python frames.py - отчет о памяти по всем таблицам
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import db
+
+logger = logging.getLogger(__name__)
+
+USE_ARROW_DTYPES = os.environ.get('OLYMPIC_RESERVE_ARROW', '0') == '1'
+
+# Текстовые столбцы с небольшим числом различных значений (свободный текст -
+# заметки, отзывы, названия - почти не повторяется и остается строками)
+CATEGORICAL_COLUMNS = {
+    'athletes': ['gender', 'sport', 'federation', 'personal_coach', 'reserve_level', 'status'],
+    'medical_records': ['health_status', 'medical_clearance'],
+    'functional_tests': ['test_type'],
+    'psychological_records': [],
+    'financial_records': ['funding_source'],
+    'mentors': ['sport'],
+    'mentorship': ['mentor_id', 'mentor_name'],
+    'training_camps': ['location', 'training_focus', 'participation_status'],
+}
+# Доля различных значений, выше которой категория не экономит память
+CATEGORY_MAX_RATIO = 0.5
+
+DATE_COLUMNS = {
+    'athletes': ['date_of_birth', 'enrollment_date'],
+    'medical_records': ['exam_date'],
+    'functional_tests': ['test_date'],
+    'psychological_records': ['assessment_date'],
+    'financial_records': ['record_date'],
+    'mentorship': ['program_start_date', 'last_consultation_date'],
+    'training_camps': ['start_date', 'end_date'],
+}
+
+# Последние измерения: {таблица: (байт до, байт после)}
+MEMORY_STATS = {}
+
+def _arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def memory_bytes(df):
+    """Фактический объем DataFrame в памяти (включая строки)"""
+    return int(df.memory_usage(deep=True).sum())
+
+def _downcast_float(series):
+    """float32, только если все значения представимы в нем без изменений"""
+    downcast = pd.to_numeric(series, downcast='float')
+    if downcast.dtype == series.dtype:
+        return series
+    if np.array_equal(downcast.to_numpy('float64'), series.to_numpy('float64'), equal_nan=True):
+        return downcast
+    # Замеры вроде 45.3 в float32 превращаются в 45.29999923706055 в таблицах и выгрузках
+    return series
+
+def compact(df, table, use_arrow=None):
+    """Преобразовать DataFrame таблицы в компактные типы.
+
+    - столбцы из CATEGORICAL_COLUMNS с долей различных значений не выше
+      CATEGORY_MAX_RATIO -> category;
+    - столбцы из DATE_COLUMNS -> datetime64;
+    - целые -> минимальный целый тип; дробные -> float32, только если
+      значения не меняются (иначе float64);
+    - остальные строки -> string[pyarrow] при use_arrow.
+    """
+    if df.empty:
+        return df
+    use_arrow = USE_ARROW_DTYPES if use_arrow is None else use_arrow
+    use_arrow = use_arrow and _arrow_available()
+    before = memory_bytes(df)
+    df = df.copy()
+
+    categorical = set(CATEGORICAL_COLUMNS.get(table, []))
+    dates = set(DATE_COLUMNS.get(table, []))
+
+    for column in df.columns:
+        series = df[column]
+        if column in categorical:
+            if series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+                df[column] = series.astype('category')
+        elif column in dates:
+            df[column] = pd.to_datetime(series, errors='coerce')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = _downcast_float(series)
+        elif use_arrow and pd.api.types.is_object_dtype(series):
+            df[column] = series.astype('string[pyarrow]')
+
+    after = memory_bytes(df)
+    MEMORY_STATS[table] = (before, after)
+    logger.info('%s: %.1f КБ -> %.1f КБ', table, before / 1024, after / 1024)
+    return df
+
+def memory_report():
+    """Сводка по памяти последних загруженных таблиц"""
+    rows = [{'table': table, 'before_bytes': before, 'after_bytes': after,
+             'ratio': before / after if after else 0.0}
+            for table, (before, after) in MEMORY_STATS.items()]
+    return pd.DataFrame(rows, columns=['table', 'before_bytes', 'after_bytes', 'ratio'])
+
+if __name__ == '__main__':
+    for table in db.TABLES:
+        compact(db.read_table(table), table)
+    print(memory_report().to_string(index=False))
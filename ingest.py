@@ -0,0 +1,239 @@
+# Olympic Reserve - Инкрементальная загрузка CSV в olympic_reserve.db
+# Запуск из командной строки:
+#   python ingest.py medical_records.csv                 таблица определяется по имени файла
+#   python ingest.py --table medical_records exams.csv   таблица задана явно
+#   python ingest.py --dir exports/                      все CSV восьми таблиц из папки
+# Строки читаются потоком и записываются пакетами (--chunk-size) в отдельных
+# транзакциях: дашборд читает БД (WAL) без ожидания, а неизменившиеся строки
+# не перезаписываются и не сбрасывают кэш приложения.
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+from itertools import islice
+
+import db
+import migrations
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+# Внешние ключи: столбец -> (таблица, ключ)
+REFERENCES = {
+    'athlete_id': ('athletes', 'athlete_id'),
+    'mentor_id': ('mentors', 'mentor_id'),
+}
+
+# ===== ПРИВЕДЕНИЕ ТИПОВ =====
+
+def _is_date_column(column):
+    return column.endswith('_date') or column == 'date_of_birth'
+
+def _coerce(value, sql_type, column):
+    """Значение из CSV -> значение для SQLite. ValueError при неверном формате"""
+    value = value.strip() if value is not None else ''
+    if value == '':
+        return None
+    if sql_type == 'INTEGER':
+        if value in ('True', 'true'):
+            return 1
+        if value in ('False', 'false'):
+            return 0
+        try:
+            number = float(value.replace(',', '.'))
+        except ValueError:
+            raise ValueError(f'{column}: ожидалось целое число, получено {value!r}')
+        if not number.is_integer():
+            raise ValueError(f'{column}: ожидалось целое число, получено {value!r}')
+        return int(number)
+    if sql_type == 'REAL':
+        try:
+            return float(value.replace(',', '.'))
+        except ValueError:
+            raise ValueError(f'{column}: ожидалось число, получено {value!r}')
+    if _is_date_column(column):
+        # Хранится нормализованная дата: fromisoformat принимает и 20250105,
+        # и 2025-W02-1, а запросы сравнивают и режут даты как текст ГГГГ-ММ-ДД
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f'{column}: ожидалась дата ГГГГ-ММ-ДД, получено {value!r}')
+    return value
+
+class TableLoader:
+    """Загрузка строк одной таблицы: проверка, приведение типов и upsert по ключу"""
+
+    def __init__(self, conn, table, fieldnames):
+        self.conn = conn
+        self.table = table
+        self.key = migrations.PRIMARY_KEYS[table]
+        info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+        self.types = {row[1]: row[2].upper() for row in info}
+        self.required = {row[1] for row in info if row[3] or row[5]}
+
+        missing = self.required - set(fieldnames)
+        if missing:
+            raise ValueError(f'{table}: в CSV нет обязательных столбцов {sorted(missing)}')
+        # Столбцы, которых нет в CSV, не затираются: upsert пишет только присланные
+        self.columns = [column for column in self.types if column in fieldnames]
+
+        updates = ', '.join(f'{c} = excluded.{c}' for c in self.columns if c != self.key)
+        changed = ' OR '.join(f'{c} IS NOT excluded.{c}' for c in self.columns if c != self.key)
+        placeholders = ', '.join('?' for _ in self.columns)
+        # WHERE в DO UPDATE: неизменившиеся строки не перезаписываются и не
+        # запускают триггеры (сводные таблицы, версии таблиц, FTS)
+        self.upsert_sql = f'''
+            INSERT INTO {table} ({', '.join(self.columns)}) VALUES ({placeholders})
+            ON CONFLICT ({self.key}) DO UPDATE SET {updates}
+            WHERE {changed}'''
+
+        self.stats = {'table': table, 'read': 0, 'inserted': 0, 'updated': 0,
+                      'unchanged': 0, 'invalid': 0, 'errors': []}
+
+    def _error(self, line, message):
+        self.stats['invalid'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append(f'строка {line}: {message}')
+
+    def _parse(self, line, record):
+        row = {}
+        for column in self.columns:
+            row[column] = _coerce(record.get(column), self.types[column], column)
+            if row[column] is None and column in self.required:
+                raise ValueError(f'{column}: пустое обязательное значение')
+        return row
+
+    def _existing(self, table, column, values):
+        rows = self.conn.execute(
+            f'SELECT {column} FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(values), ensure_ascii=False),))
+        return {row[0] for row in rows}
+
+    def load_chunk(self, numbered_records):
+        """Проверить и записать пакет [(номер строки, dict из csv)] в одной транзакции"""
+        rows = []
+        for line, record in numbered_records:
+            self.stats['read'] += 1
+            try:
+                rows.append((line, self._parse(line, record)))
+            except ValueError as e:
+                self._error(line, e)
+
+        # Ссылки на несуществующих спортсменов/наставников отсеиваются до записи
+        for column, (ref_table, ref_key) in REFERENCES.items():
+            if column not in self.columns or self.table == ref_table:
+                continue
+            values = {row[column] for _, row in rows if row[column] is not None}
+            known = self._existing(ref_table, ref_key, values)
+            valid = []
+            for line, row in rows:
+                if row[column] is not None and row[column] not in known:
+                    self._error(line, f'{column}: {row[column]!r} не найден в {ref_table}')
+                else:
+                    valid.append((line, row))
+            rows = valid
+
+        if not rows:
+            return
+
+        # Повторы ключа внутри пакета: побеждает последняя строка файла
+        by_key = {row[self.key]: row for _, row in rows}
+
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            existing = self._existing(self.table, self.key, by_key)
+            cursor = self.conn.executemany(
+                self.upsert_sql, ([row[c] for c in self.columns] for row in by_key.values()))
+            changed = cursor.rowcount
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+        inserted = len(by_key) - len(existing)
+        self.stats['inserted'] += inserted
+        self.stats['updated'] += changed - inserted
+        self.stats['unchanged'] += len(by_key) - changed
+
+# ===== ЗАГРУЗКА ФАЙЛОВ =====
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(f'PRAGMA busy_timeout = {db.BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+def ingest_file(path, table=None, db_path=None, chunk_size=CHUNK_SIZE):
+    """Загрузить один CSV-файл. Возвращает статистику загрузки"""
+    db_path = db_path or db.DB_NAME
+    table = table or os.path.splitext(os.path.basename(path))[0]
+    if table not in migrations.PRIMARY_KEYS:
+        raise ValueError(f'Неизвестная таблица: {table}')
+
+    migrations.migrate(db_path)
+    conn = _connect(db_path)
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            loader = TableLoader(conn, table, reader.fieldnames or [])
+            # Номер строки файла с учетом заголовка
+            records = enumerate(reader, start=2)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                loader.load_chunk(chunk)
+        conn.execute('PRAGMA optimize')
+    finally:
+        conn.close()
+    return loader.stats
+
+def ingest_directory(directory, db_path=None, chunk_size=CHUNK_SIZE):
+    """Загрузить CSV всех таблиц из папки (родительские таблицы - первыми)"""
+    results = []
+    for table in migrations.TABLE_SCHEMAS:
+        path = os.path.join(directory, f'{table}.csv')
+        if os.path.exists(path):
+            results.append(ingest_file(path, table, db_path, chunk_size))
+    return results
+
+# ===== КОМАНДНАЯ СТРОКА =====
+
+def _print_stats(stats):
+    print(f"{stats['table']}: прочитано {stats['read']}, добавлено {stats['inserted']}, "
+          f"обновлено {stats['updated']}, без изменений {stats['unchanged']}, "
+          f"ошибок {stats['invalid']}")
+    for error in stats['errors']:
+        print(f'  ⚠️ {error}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Инкрементальная загрузка CSV в БД Olympic Reserve')
+    parser.add_argument('files', nargs='*', help='CSV-файлы (имя файла = имя таблицы)')
+    parser.add_argument('--table', help='таблица для единственного файла')
+    parser.add_argument('--dir', help='папка с CSV всех таблиц')
+    parser.add_argument('--db', default=db.DB_NAME, help='путь к файлу SQLite')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='строк в транзакции')
+    args = parser.parse_args(argv)
+
+    if args.table and len(args.files) != 1:
+        parser.error('--table можно указать только для одного файла')
+    if not args.files and not args.dir:
+        parser.error('укажите CSV-файлы или --dir')
+
+    results = []
+    if args.dir:
+        results.extend(ingest_directory(args.dir, args.db, args.chunk_size))
+    for path in args.files:
+        results.append(ingest_file(path, args.table, args.db, args.chunk_size))
+
+    for stats in results:
+        _print_stats(stats)
+    return 1 if any(stats['invalid'] for stats in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
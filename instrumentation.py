@@ -0,0 +1,221 @@
+# Olympic Reserve - Замеры времени загрузки данных и отрисовки страниц
+# Декоратор timed и контекстный менеджер timer записывают по каждому вызову
+# время, число строк и объем результата; cache_miss помечает вызовы, для
+# которых st.cache_data выполнил тело функции (промах кэша).
+# Метрики общие для процесса (всех сессий) и выгружаются в JSON или в
+# текстовом формате Prometheus.
+
+import functools
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+LATENCY_WINDOW = 1000      # последних замеров на метрику для квантилей
+QUANTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_PREFIX = 'olympic_reserve'
+
+# ===== ХРАНИЛИЩЕ =====
+
+class _Stats:
+    __slots__ = ('kind', 'calls', 'errors', 'seconds', 'max_seconds', 'rows', 'bytes',
+                 'cache_calls', 'cache_misses', 'latencies')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.cache_calls = 0
+        self.cache_misses = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+def _size(result):
+    """(строк, байт) результата загрузки"""
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(deep=True).sum())
+    if isinstance(result, (bytes, bytearray)):
+        return 0, len(result)
+    if hasattr(result, 'getbuffer'):
+        return 0, result.getbuffer().nbytes
+    if isinstance(result, (list, tuple)):
+        return len(result), sys.getsizeof(result)
+    if isinstance(result, dict):
+        # Набор таблиц (например, аналитика сборов) - суммарный объем значений
+        sizes = [_size(value) for value in result.values()]
+        if any(isinstance(value, pd.DataFrame) for value in result.values()):
+            return sum(r for r, _ in sizes), sum(b for _, b in sizes)
+        return 1, sys.getsizeof(result)
+    return 0, 0
+
+def _record(name, kind, seconds, result=None, error=False, cached=None):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _Stats(kind)
+        stats.calls += 1
+        stats.errors += error
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.latencies.append(seconds)
+        if result is not None:
+            rows, size = _size(result)
+            stats.rows += rows
+            stats.bytes = size
+        if cached is not None:
+            stats.cache_calls += 1
+            stats.cache_misses += not cached
+
+def reset():
+    """Сбросить все накопленные метрики"""
+    with _lock:
+        _stats.clear()
+
+# ===== ЗАМЕРЫ =====
+
+class _Call:
+    __slots__ = ('name', 'kind', 'result', 'miss', 'cached')
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.result = None
+        self.miss = False
+        self.cached = False
+
+    def set_result(self, result):
+        """Результат блока with - для подсчета строк и байт"""
+        self.result = result
+        return result
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def timer(name, kind='block'):
+    """Замерить блок with: with timer('page:Финансирование', 'page') as call: ..."""
+    call = _Call(name, kind)
+    stack = _stack()
+    stack.append(call)
+    start = time.perf_counter()
+    error = False
+    try:
+        yield call
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        _record(name, kind, seconds, call.result, error,
+                cached=(not call.miss) if call.cached else None)
+
+def timed(name=None, kind='loader', cached=False):
+    """Декоратор: замер каждого вызова функции.
+
+    cached=True - функция читает данные через st.cache_data; промахи
+    отмечаются декоратором cache_miss на кэшируемой функции.
+    """
+    def decorator(func):
+        metric = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(metric, kind) as call:
+                call.cached = cached
+                return call.set_result(func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+def cache_miss(func):
+    """Декоратор тела кэшируемой функции (под @st.cache_data).
+
+    Тело выполняется только при промахе кэша, поэтому вызов помечает
+    ближайший внешний замер timed как промах.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        if stack:
+            stack[-1].miss = True
+        return func(*args, **kwargs)
+    return wrapper
+
+# ===== ВЫГРУЗКА =====
+
+def snapshot():
+    """Метрики в виде списка словарей (по одному на замеряемую функцию)"""
+    with _lock:
+        items = [(name, stats, list(stats.latencies)) for name, stats in _stats.items()]
+    result = []
+    for name, stats, latencies in sorted(items):
+        quantiles = np.quantile(latencies, QUANTILES) if latencies else [0.0] * len(QUANTILES)
+        hits = stats.cache_calls - stats.cache_misses
+        result.append({
+            'name': name,
+            'kind': stats.kind,
+            'calls': stats.calls,
+            'errors': stats.errors,
+            'total_seconds': stats.seconds,
+            'mean_seconds': stats.seconds / stats.calls if stats.calls else 0.0,
+            'max_seconds': stats.max_seconds,
+            **{f'p{int(q * 100)}_seconds': float(v) for q, v in zip(QUANTILES, quantiles)},
+            'rows': stats.rows,
+            'last_bytes': stats.bytes,
+            'cache_hits': hits,
+            'cache_misses': stats.cache_misses,
+            'cache_hit_ratio': hits / stats.cache_calls if stats.cache_calls else None,
+        })
+    return result
+
+def to_dataframe():
+    return pd.DataFrame(snapshot())
+
+def to_json(indent=2):
+    return json.dumps({'generated_at': time.time(), 'metrics': snapshot()},
+                      ensure_ascii=False, indent=indent)
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def to_prometheus():
+    """Метрики в текстовом формате Prometheus (exposition format 0.0.4)"""
+    families = [
+        ('calls_total', 'counter', 'Число вызовов', 'calls'),
+        ('errors_total', 'counter', 'Число вызовов с исключением', 'errors'),
+        ('rows_total', 'counter', 'Строк возвращено', 'rows'),
+        ('result_bytes', 'gauge', 'Объем последнего результата, байт', 'last_bytes'),
+        ('cache_hits_total', 'counter', 'Попаданий в кэш', 'cache_hits'),
+        ('cache_misses_total', 'counter', 'Промахов кэша', 'cache_misses'),
+    ]
+    metrics = snapshot()
+    lines = []
+    for suffix, kind, help_text, key in families:
+        family = f'{PROMETHEUS_PREFIX}_{suffix}'
+        lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}']
+        for m in metrics:
+            lines.append(f'{family}{{name="{_label(m["name"])}",kind="{m["kind"]}"}} {m[key]}')
+
+    family = f'{PROMETHEUS_PREFIX}_latency_seconds'
+    lines += [f'# HELP {family} Время выполнения, с', f'# TYPE {family} summary']
+    for m in metrics:
+        labels = f'name="{_label(m["name"])}",kind="{m["kind"]}"'
+        for q in QUANTILES:
+            lines.append(f'{family}{{{labels},quantile="{q}"}} {m[f"p{int(q * 100)}_seconds"]:.6f}')
+        lines.append(f'{family}_sum{{{labels}}} {m["total_seconds"]:.6f}')
+        lines.append(f'{family}_count{{{labels}}} {m["calls"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,518 @@
+# Olympic Reserve - Версионные миграции схемы БД
+# Запуск из командной строки:
+#   python migrations.py                  применить все новые миграции
+#   python migrations.py --status         показать текущую версию схемы
+#   python migrations.py --db path.db     указать другой файл БД
+# Приложение (app.py) применяет миграции автоматически при старте.
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+
+import db
+
+# ===== ОПИСАНИЕ СХЕМЫ =====
+
+# Таблицы перечислены в порядке зависимостей: родительские раньше дочерних
+TABLE_SCHEMAS = {
+    'athletes': '''
+        CREATE TABLE athletes (
+            athlete_id TEXT PRIMARY KEY NOT NULL,
+            full_name TEXT NOT NULL,
+            gender TEXT,
+            age INTEGER,
+            date_of_birth TEXT,
+            sport TEXT,
+            federation TEXT,
+            personal_coach TEXT,
+            height_cm REAL,
+            weight_kg REAL,
+            body_fat_percent REAL,
+            muscle_mass_percent REAL,
+            vo2_max_ml_kg_min REAL,
+            heart_rate_peak_bpm INTEGER,
+            resting_heart_rate_bpm INTEGER,
+            training_experience_years INTEGER,
+            reserve_level TEXT,
+            enrollment_date TEXT,
+            status TEXT,
+            rating_position INTEGER
+        )''',
+    'mentors': '''
+        CREATE TABLE mentors (
+            mentor_id TEXT PRIMARY KEY NOT NULL,
+            full_name TEXT NOT NULL,
+            sport TEXT,
+            olympian INTEGER,
+            medals INTEGER
+        )''',
+    'medical_records': '''
+        CREATE TABLE medical_records (
+            medical_record_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            exam_date TEXT,
+            height_cm REAL,
+            weight_kg REAL,
+            body_fat_percent REAL,
+            bmi REAL,
+            resting_heart_rate INTEGER,
+            max_heart_rate INTEGER,
+            vo2_peak_ml_kg_min REAL,
+            systolic_blood_pressure INTEGER,
+            diastolic_blood_pressure INTEGER,
+            fasting_glucose_mg_dl REAL,
+            hemoglobin_g_dl REAL,
+            hematocrit_percent REAL,
+            health_status TEXT,
+            medical_clearance TEXT
+        )''',
+    'functional_tests': '''
+        CREATE TABLE functional_tests (
+            test_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            test_date TEXT,
+            test_type TEXT,
+            vo2_max_ml_kg_min REAL,
+            anaerobic_threshold_percent REAL,
+            peak_power_watts REAL,
+            performance_time_seconds INTEGER,
+            distance_covered_m REAL,
+            notes TEXT
+        )''',
+    'psychological_records': '''
+        CREATE TABLE psychological_records (
+            psych_record_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            assessment_date TEXT,
+            motivation_level_1_10 INTEGER,
+            stress_resilience_1_10 INTEGER,
+            anxiety_level_1_10 INTEGER,
+            self_confidence_1_10 INTEGER,
+            concentration_ability_1_10 INTEGER,
+            team_cooperation_1_10 INTEGER,
+            recovery_rate_1_10 INTEGER,
+            overall_psychological_score_1_100 REAL,
+            psychologist_notes TEXT
+        )''',
+    'financial_records': '''
+        CREATE TABLE financial_records (
+            finance_record_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            record_date TEXT,
+            monthly_stipend_rub INTEGER,
+            equipment_budget_rub INTEGER,
+            accommodation_budget_rub INTEGER,
+            training_camp_budget_rub INTEGER,
+            medical_services_budget_rub INTEGER,
+            psychological_services_budget_rub INTEGER,
+            total_monthly_budget_rub INTEGER,
+            funding_source TEXT
+        )''',
+    'mentorship': '''
+        CREATE TABLE mentorship (
+            mentorship_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            mentor_id TEXT REFERENCES mentors(mentor_id) ON DELETE SET NULL,
+            mentor_name TEXT,
+            program_start_date TEXT,
+            consultation_frequency_per_month INTEGER,
+            last_consultation_date TEXT,
+            mentee_progress_rating_1_10 INTEGER,
+            mentee_feedback TEXT
+        )''',
+    'training_camps': '''
+        CREATE TABLE training_camps (
+            camp_id TEXT PRIMARY KEY NOT NULL,
+            athlete_id TEXT NOT NULL REFERENCES athletes(athlete_id) ON DELETE CASCADE,
+            camp_name TEXT,
+            location TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            duration_days INTEGER,
+            training_focus TEXT,
+            average_daily_training_hours REAL,
+            participation_status TEXT,
+            improvement_rating_1_10 INTEGER
+        )''',
+}
+
+# Первичный ключ каждой таблицы (используется также при загрузке данных)
+PRIMARY_KEYS = {
+    'athletes': 'athlete_id',
+    'mentors': 'mentor_id',
+    'medical_records': 'medical_record_id',
+    'functional_tests': 'test_id',
+    'psychological_records': 'psych_record_id',
+    'financial_records': 'finance_record_id',
+    'mentorship': 'mentorship_id',
+    'training_camps': 'camp_id',
+}
+
+# ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
+
+def _execute_script(conn, script):
+    """Выполнить несколько SQL-выражений внутри текущей транзакции.
+
+    conn.executescript() делает COMMIT перед выполнением, поэтому
+    выражения разбираются по одному через sqlite3.complete_statement
+    (корректно для триггеров с BEGIN ... END).
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                conn.execute(statement)
+            statement = ''
+    if statement.strip():
+        raise ValueError(f'Незавершенное SQL-выражение: {statement.strip()[:80]}')
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def _rebuild_table(conn, table, create_sql):
+    """Пересоздать таблицу по новому описанию с сохранением данных"""
+    old_columns = _table_columns(conn, table)
+    conn.execute(create_sql.replace(f'CREATE TABLE {table} ', f'CREATE TABLE {table}__new ', 1))
+    if old_columns:
+        new_columns = _table_columns(conn, f'{table}__new')
+        columns = ', '.join(c for c in new_columns if c in old_columns)
+        conn.execute(f'INSERT INTO {table}__new ({columns}) SELECT {columns} FROM {table}')
+        conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {table}__new RENAME TO {table}')
+
+# ===== МИГРАЦИИ =====
+
+def _migration_001_keys_and_indexes(conn):
+    """Первичные и внешние ключи, индексы по спортсмену и дате"""
+    for table, create_sql in TABLE_SCHEMAS.items():
+        _rebuild_table(conn, table, create_sql)
+
+    _execute_script(conn, '''
+        CREATE INDEX idx_medical_athlete_date ON medical_records (athlete_id, exam_date);
+        CREATE INDEX idx_psych_athlete_date ON psychological_records (athlete_id, assessment_date);
+        CREATE INDEX idx_tests_athlete_date ON functional_tests (athlete_id, test_date);
+        CREATE INDEX idx_camps_athlete_date ON training_camps (athlete_id, start_date);
+        CREATE INDEX idx_finance_athlete_date ON financial_records (athlete_id, record_date);
+        CREATE INDEX idx_mentorship_athlete ON mentorship (athlete_id);
+        CREATE INDEX idx_mentorship_mentor ON mentorship (mentor_id);
+    ''')
+
+    problems = conn.execute('PRAGMA foreign_key_check').fetchall()
+    if problems:
+        raise sqlite3.IntegrityError(f'Нарушены внешние ключи: {len(problems)} строк, '
+                                     f'например {tuple(problems[0])}')
+
+def _migration_002_sport_index(conn):
+    """Индекс для выборок куратора по виду спорта"""
+    conn.execute('CREATE INDEX idx_athletes_sport ON athletes (sport, athlete_id)')
+
+# Сводные таблицы поддерживаются триггерами при каждой записи, поэтому
+# страницы статистики и финансирования читают сотни строк вместо всей таблицы.
+
+def _athlete_summary_delta(row, sign):
+    """Upsert вклада строки athletes (NEW/OLD) в athlete_summary; sign: + или -"""
+    return f"""
+        INSERT INTO athlete_summary (sport, reserve_level, gender, athlete_count,
+                                     age_sum, age_count, vo2_sum, vo2_count)
+        VALUES (IFNULL({row}.sport, ''), IFNULL({row}.reserve_level, ''), IFNULL({row}.gender, ''),
+                {sign}1,
+                {sign}IFNULL({row}.age, 0), {sign}({row}.age IS NOT NULL),
+                {sign}IFNULL({row}.vo2_max_ml_kg_min, 0), {sign}({row}.vo2_max_ml_kg_min IS NOT NULL))
+        ON CONFLICT (sport, reserve_level, gender) DO UPDATE SET
+            athlete_count = athlete_count + excluded.athlete_count,
+            age_sum = age_sum + excluded.age_sum,
+            age_count = age_count + excluded.age_count,
+            vo2_sum = vo2_sum + excluded.vo2_sum,
+            vo2_count = vo2_count + excluded.vo2_count;"""
+
+def _finance_summary_delta(row, sign):
+    """Upsert вклада строки financial_records (NEW/OLD) в finance_summary; sign: + или -"""
+    return f"""
+        INSERT INTO finance_summary (sport, funding_source, month, record_count, total_budget_rub)
+        VALUES (IFNULL((SELECT sport FROM athletes WHERE athlete_id = {row}.athlete_id), ''),
+                IFNULL({row}.funding_source, ''), IFNULL(substr({row}.record_date, 1, 7), ''),
+                {sign}1, {sign}IFNULL({row}.total_monthly_budget_rub, 0))
+        ON CONFLICT (sport, funding_source, month) DO UPDATE SET
+            record_count = record_count + excluded.record_count,
+            total_budget_rub = total_budget_rub + excluded.total_budget_rub;"""
+
+def _finance_summary_move(sport_expr, athlete_id_expr, sign):
+    """Перенос всех финансовых записей спортсмена при смене вида спорта"""
+    return f"""
+        INSERT INTO finance_summary (sport, funding_source, month, record_count, total_budget_rub)
+        SELECT IFNULL({sport_expr}, ''), IFNULL(funding_source, ''), IFNULL(substr(record_date, 1, 7), ''),
+               {sign}COUNT(*), {sign}IFNULL(SUM(total_monthly_budget_rub), 0)
+        FROM financial_records
+        WHERE athlete_id = {athlete_id_expr}
+        GROUP BY 2, 3
+        ON CONFLICT (sport, funding_source, month) DO UPDATE SET
+            record_count = record_count + excluded.record_count,
+            total_budget_rub = total_budget_rub + excluded.total_budget_rub;"""
+
+def _migration_003_summary_tables(conn):
+    """Сводные таблицы для страниц статистики и финансирования"""
+    _execute_script(conn, f'''
+        CREATE TABLE athlete_summary (
+            sport TEXT NOT NULL,
+            reserve_level TEXT NOT NULL,
+            gender TEXT NOT NULL,
+            athlete_count INTEGER NOT NULL DEFAULT 0,
+            age_sum REAL NOT NULL DEFAULT 0,
+            age_count INTEGER NOT NULL DEFAULT 0,
+            vo2_sum REAL NOT NULL DEFAULT 0,
+            vo2_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sport, reserve_level, gender)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE finance_summary (
+            sport TEXT NOT NULL,
+            funding_source TEXT NOT NULL,
+            month TEXT NOT NULL,
+            record_count INTEGER NOT NULL DEFAULT 0,
+            total_budget_rub INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sport, funding_source, month)
+        ) WITHOUT ROWID;
+
+        INSERT INTO athlete_summary
+        SELECT IFNULL(sport, ''), IFNULL(reserve_level, ''), IFNULL(gender, ''), COUNT(*),
+               IFNULL(SUM(age), 0), COUNT(age),
+               IFNULL(SUM(vo2_max_ml_kg_min), 0), COUNT(vo2_max_ml_kg_min)
+        FROM athletes
+        GROUP BY 1, 2, 3;
+
+        INSERT INTO finance_summary
+        SELECT IFNULL(a.sport, ''), IFNULL(f.funding_source, ''), IFNULL(substr(f.record_date, 1, 7), ''),
+               COUNT(*), IFNULL(SUM(f.total_monthly_budget_rub), 0)
+        FROM financial_records f
+        LEFT JOIN athletes a ON a.athlete_id = f.athlete_id
+        GROUP BY 1, 2, 3;
+
+        CREATE TRIGGER trg_athletes_summary_insert AFTER INSERT ON athletes
+        BEGIN
+            {_athlete_summary_delta('NEW', '+')}
+        END;
+
+        CREATE TRIGGER trg_athletes_summary_delete AFTER DELETE ON athletes
+        BEGIN
+            {_athlete_summary_delta('OLD', '-')}
+            DELETE FROM athlete_summary WHERE athlete_count <= 0;
+        END;
+
+        CREATE TRIGGER trg_athletes_summary_update
+        AFTER UPDATE OF sport, reserve_level, gender, age, vo2_max_ml_kg_min ON athletes
+        BEGIN
+            {_athlete_summary_delta('OLD', '-')}
+            {_athlete_summary_delta('NEW', '+')}
+            DELETE FROM athlete_summary WHERE athlete_count <= 0;
+        END;
+
+        -- Финансовые записи удаляются до удаления спортсмена, пока его вид спорта известен
+        CREATE TRIGGER trg_athletes_finance_delete BEFORE DELETE ON athletes
+        BEGIN
+            DELETE FROM financial_records WHERE athlete_id = OLD.athlete_id;
+        END;
+
+        CREATE TRIGGER trg_athletes_finance_sport AFTER UPDATE OF sport ON athletes
+        WHEN OLD.sport IS NOT NEW.sport
+        BEGIN
+            {_finance_summary_move('OLD.sport', 'NEW.athlete_id', '-')}
+            {_finance_summary_move('NEW.sport', 'NEW.athlete_id', '+')}
+            DELETE FROM finance_summary WHERE record_count <= 0;
+        END;
+
+        CREATE TRIGGER trg_finance_summary_insert AFTER INSERT ON financial_records
+        BEGIN
+            {_finance_summary_delta('NEW', '+')}
+        END;
+
+        CREATE TRIGGER trg_finance_summary_delete AFTER DELETE ON financial_records
+        BEGIN
+            {_finance_summary_delta('OLD', '-')}
+            DELETE FROM finance_summary WHERE record_count <= 0;
+        END;
+
+        CREATE TRIGGER trg_finance_summary_update
+        AFTER UPDATE OF athlete_id, record_date, total_monthly_budget_rub, funding_source
+        ON financial_records
+        BEGIN
+            {_finance_summary_delta('OLD', '-')}
+            {_finance_summary_delta('NEW', '+')}
+            DELETE FROM finance_summary WHERE record_count <= 0;
+        END;
+    ''')
+
+def _migration_004_table_versions(conn):
+    """Счетчики изменений таблиц для инвалидации кэша приложения"""
+    conn.execute('''
+        CREATE TABLE table_versions (
+            table_name TEXT PRIMARY KEY NOT NULL,
+            version INTEGER NOT NULL
+        )''')
+    # Начальное значение случайное: если файл БД пересоздан целиком,
+    # версии не совпадут с ключами кэша, оставшимися от старого файла
+    for table in db.TABLES:
+        conn.execute('INSERT INTO table_versions (table_name, version) '
+                     'VALUES (?, abs(random() % 1000000000))', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END''')
+
+def _migration_005_sort_indexes(conn):
+    """Индексы для постраничной сортировки списка спортсменов по ФИО"""
+    _execute_script(conn, '''
+        CREATE INDEX idx_athletes_name ON athletes (full_name);
+        CREATE INDEX idx_athletes_sport_name ON athletes (sport, full_name);
+    ''')
+
+def _migration_006_athlete_search(conn):
+    """Полнотекстовый индекс FTS5 по ФИО и ID для поиска спортсмена.
+
+    Если SQLite собран без FTS5, миграция ничего не создает, а
+    queries.search_athletes() использует поиск через LIKE.
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE athletes_fts USING fts5 (
+                athlete_id, full_name,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )''')
+    except sqlite3.OperationalError:
+        return
+
+    # Таблица хранит собственную копию текста и связана с athletes по athlete_id
+    # (rowid таблицы без INTEGER PRIMARY KEY может измениться после VACUUM)
+    _execute_script(conn, '''
+        INSERT INTO athletes_fts (athlete_id, full_name)
+        SELECT athlete_id, full_name FROM athletes;
+
+        CREATE TRIGGER trg_athletes_fts_insert AFTER INSERT ON athletes
+        BEGIN
+            INSERT INTO athletes_fts (athlete_id, full_name) VALUES (NEW.athlete_id, NEW.full_name);
+        END;
+
+        CREATE TRIGGER trg_athletes_fts_delete AFTER DELETE ON athletes
+        BEGIN
+            DELETE FROM athletes_fts WHERE athlete_id = OLD.athlete_id;
+        END;
+
+        CREATE TRIGGER trg_athletes_fts_update AFTER UPDATE OF athlete_id, full_name ON athletes
+        WHEN OLD.athlete_id IS NOT NEW.athlete_id OR OLD.full_name IS NOT NEW.full_name
+        BEGIN
+            DELETE FROM athletes_fts WHERE athlete_id = OLD.athlete_id;
+            INSERT INTO athletes_fts (athlete_id, full_name) VALUES (NEW.athlete_id, NEW.full_name);
+        END;
+    ''')
+
+# (версия, описание, функция)
+MIGRATIONS = [
+    (1, 'Первичные/внешние ключи и индексы (athlete_id, дата)', _migration_001_keys_and_indexes),
+    (2, 'Индекс athletes (sport) для выборок куратора', _migration_002_sport_index),
+    (3, 'Сводные таблицы athlete_summary и finance_summary', _migration_003_summary_tables),
+    (4, 'Счетчики изменений table_versions для инвалидации кэша', _migration_004_table_versions),
+    (5, 'Индексы athletes (full_name) для постраничной сортировки', _migration_005_sort_indexes),
+    (6, 'Полнотекстовый поиск спортсменов athletes_fts', _migration_006_athlete_search),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# ===== ПРИМЕНЕНИЕ =====
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )''')
+
+def get_version(conn):
+    """Текущая версия схемы (0 - миграции не применялись)"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master "
+                          "WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if not exists:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def migrate(db_path=None, verbose=False):
+    """Применить все непримененные миграции. Возвращает список примененных версий.
+
+    Каждая миграция выполняется в отдельной транзакции BEGIN IMMEDIATE,
+    поэтому одновременный запуск из нескольких процессов безопасен:
+    второй процесс дождется блокировки и увидит уже обновленную версию.
+    """
+    db_path = db_path or db.DB_NAME
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(f'PRAGMA busy_timeout = {db.BUSY_TIMEOUT_MS}')
+    # При пересоздании таблиц внешние ключи проверяются вручную (foreign_key_check)
+    conn.execute('PRAGMA foreign_keys = OFF')
+    applied = []
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        _ensure_version_table(conn)
+        conn.execute('COMMIT')
+
+        for version, description, apply in MIGRATIONS:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if get_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                if verbose:
+                    print(f'→ Миграция {version}: {description}')
+                apply(conn)
+                conn.execute('INSERT INTO schema_version (version, description, applied_at) '
+                             'VALUES (?, ?, ?)',
+                             (version, description, datetime.now().isoformat(timespec='seconds')))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append(version)
+
+        if applied:
+            conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    return applied
+
+def status(db_path=None):
+    """Список примененных миграций: [(версия, описание, дата)]"""
+    conn = sqlite3.connect(db_path or db.DB_NAME)
+    try:
+        if get_version(conn) == 0:
+            return []
+        return conn.execute('SELECT version, description, applied_at '
+                            'FROM schema_version ORDER BY version').fetchall()
+    finally:
+        conn.close()
+
+# ===== КОМАНДНАЯ СТРОКА =====
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Миграции схемы БД Olympic Reserve')
+    parser.add_argument('--db', default=db.DB_NAME, help='путь к файлу SQLite')
+    parser.add_argument('--status', action='store_true', help='показать примененные миграции')
+    args = parser.parse_args(argv)
+
+    if args.status:
+        rows = status(args.db)
+        for version, description, applied_at in rows:
+            print(f'{version:>4}  {applied_at}  {description}')
+        current = rows[-1][0] if rows else 0
+        print(f'Версия схемы: {current} (последняя: {LATEST_VERSION})')
+        return 0
+
+    applied = migrate(args.db, verbose=True)
+    if applied:
+        print(f'✅ Применено миграций: {len(applied)}')
+    else:
+        print('✅ Схема актуальна')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+# Olympic Reserve - Параметризованные запросы к БД
+# Запросы используют индексы из migrations.py и не зависят от Streamlit:
+# кэширование результатов выполняется в app.py
+
+import db
+import migrations
+
+def _to_dict(row):
+    """sqlite3.Row -> dict (sqlite3.Row не сериализуется для st.cache_data)"""
+    return dict(row) if row is not None else None
+
+# ===== ЗАПРОСЫ ПО ОДНОМУ СПОРТСМЕНУ =====
+
+def get_athlete(athlete_id):
+    """Карточка спортсмена или None"""
+    return _to_dict(db.fetch_one('SELECT * FROM athletes WHERE athlete_id = ?',
+                                 (athlete_id,)))
+
+def latest_medical_exam(athlete_id):
+    """Последний по дате медицинский осмотр или None"""
+    return _to_dict(db.fetch_one('''
+        SELECT * FROM medical_records
+        WHERE athlete_id = ?
+        ORDER BY exam_date DESC, medical_record_id DESC
+        LIMIT 1''', (athlete_id,)))
+
+def latest_psych_assessment(athlete_id):
+    """Последняя по дате психологическая оценка или None"""
+    return _to_dict(db.fetch_one('''
+        SELECT * FROM psychological_records
+        WHERE athlete_id = ?
+        ORDER BY assessment_date DESC, psych_record_id DESC
+        LIMIT 1''', (athlete_id,)))
+
+def test_history(athlete_id):
+    """История функциональных тестов спортсмена в хронологическом порядке"""
+    return db.read_sql('''
+        SELECT * FROM functional_tests
+        WHERE athlete_id = ?
+        ORDER BY test_date, test_id''', (athlete_id,))
+
+# ===== ЗАПРОСЫ С ОГРАНИЧЕНИЕМ ПО ВИДУ СПОРТА =====
+
+# Таблицы со своим столбцом sport; строки остальных таблиц относятся к виду
+# спорта через athletes, поэтому их выборка зависит и от версии athletes
+SPORT_TABLES = ('athletes', 'mentors')
+
+def scoped_table(table, sport=None):
+    """Таблица целиком (sport=None) или только строки вида спорта куратора.
+
+    Вид спорта становится условием WHERE, поэтому сессия куратора
+    никогда не загружает строки других видов спорта.
+    """
+    if table not in db.TABLES:
+        raise ValueError(f'Неизвестная таблица: {table}')
+    if sport is None:
+        return db.read_table(table)
+    if table in SPORT_TABLES:
+        return db.read_sql(f'SELECT * FROM {table} WHERE sport = ?', (sport,))
+    return db.read_sql(f'''
+        SELECT t.* FROM {table} t
+        JOIN athletes a ON a.athlete_id = t.athlete_id
+        WHERE a.sport = ?''', (sport,))
+
+def _scoped_from(table, sport):
+    """FROM и WHERE для строк таблицы, видимых куратору вида спорта"""
+    if table not in db.TABLES:
+        raise ValueError(f'Неизвестная таблица: {table}')
+    if sport is None:
+        return f'{table} t', '', ()
+    if table in SPORT_TABLES:
+        return f'{table} t', 'WHERE t.sport = ?', (sport,)
+    return f'{table} t JOIN athletes a ON a.athlete_id = t.athlete_id', 'WHERE a.sport = ?', (sport,)
+
+def scoped_count(table, sport=None):
+    """Число строк таблицы (с ограничением по виду спорта)"""
+    source, where, params = _scoped_from(table, sport)
+    return db.fetch_one(f'SELECT COUNT(*) FROM {source} {where}', params)[0]
+
+def scoped_rows(table, sport=None, limit=100, offset=0):
+    """Страница строк таблицы в порядке первичного ключа"""
+    source, where, params = _scoped_from(table, sport)
+    return db.read_sql(f'''
+        SELECT t.* FROM {source} {where}
+        ORDER BY t.{migrations.PRIMARY_KEYS[table]}
+        LIMIT ? OFFSET ?''', (*params, int(limit), int(offset)))
+
+# ===== СВОДНЫЕ ТАБЛИЦЫ (поддерживаются триггерами, см. migrations.py) =====
+
+def athlete_summary(sport=None):
+    """Сводка: вид спорта × уровень резерва × пол"""
+    if sport is None:
+        return db.read_sql('SELECT * FROM athlete_summary')
+    return db.read_sql('SELECT * FROM athlete_summary WHERE sport = ?', (sport,))
+
+def finance_summary(sport=None):
+    """Сводка: вид спорта × источник финансирования × месяц"""
+    if sport is None:
+        return db.read_sql('SELECT * FROM finance_summary')
+    return db.read_sql('SELECT * FROM finance_summary WHERE sport = ?', (sport,))
+
+# ===== ПОКАЗАТЕЛИ ДЛЯ СРАВНЕНИЯ С КОГОРТОЙ =====
+
+def cohort_metrics():
+    """Показатели всех спортсменов: карточка + последний осмотр и оценка психолога.
+
+    Одна строка на спортсмена; последние записи выбираются оконной функцией
+    за один проход по medical_records и psychological_records.
+    """
+    return db.read_sql('''
+        SELECT a.athlete_id, a.sport, a.gender, a.age,
+               a.vo2_max_ml_kg_min, a.resting_heart_rate_bpm, a.heart_rate_peak_bpm,
+               a.body_fat_percent, a.muscle_mass_percent,
+               m.hemoglobin_g_dl, m.vo2_peak_ml_kg_min,
+               p.motivation_level_1_10, p.stress_resilience_1_10,
+               p.overall_psychological_score_1_100
+        FROM athletes a
+        LEFT JOIN (
+            SELECT athlete_id, hemoglobin_g_dl, vo2_peak_ml_kg_min, ROW_NUMBER() OVER (
+                PARTITION BY athlete_id ORDER BY exam_date DESC, medical_record_id DESC) AS rn
+            FROM medical_records
+        ) m ON m.athlete_id = a.athlete_id AND m.rn = 1
+        LEFT JOIN (
+            SELECT athlete_id, motivation_level_1_10, stress_resilience_1_10,
+                   overall_psychological_score_1_100, ROW_NUMBER() OVER (
+                PARTITION BY athlete_id ORDER BY assessment_date DESC, psych_record_id DESC) AS rn
+            FROM psychological_records
+        ) p ON p.athlete_id = a.athlete_id AND p.rn = 1''')
+
+# ===== ВЕРСИИ ТАБЛИЦ =====
+
+def table_versions():
+    """Счетчики изменений таблиц: {имя таблицы: версия}"""
+    return {row['table_name']: row['version']
+            for row in db.fetch_all('SELECT table_name, version FROM table_versions')}
+
+# ===== ПОСТРАНИЧНЫЕ ВЫБОРКИ ДЛЯ ТАБЛИЦ =====
+
+# Описание таблиц с постраничной загрузкой: что выбирать, по чему искать,
+# сортировать и фильтровать. Имена столбцов подставляются в SQL только из
+# этих списков, значения - только через параметры.
+# ФИО и ID ищутся по индексу athletes_fts (префиксы слов) через столбец
+# 'fts_key'; 'search' - столбцы, которые просматриваются построчно
+# (casefold + LIKE), 'fts_columns' - они же без FTS5.
+PAGED_QUERIES = {
+    'athletes': {
+        'from': 'athletes a',
+        'alias': 'a',
+        'columns': ['athlete_id', 'full_name', 'gender', 'age', 'sport',
+                    'reserve_level', 'vo2_max_ml_kg_min', 'status'],
+        'fts_key': 'a.athlete_id',
+        'fts_columns': ['a.full_name', 'a.athlete_id'],
+        'search': ['a.personal_coach'],
+        'filters': ['gender', 'reserve_level', 'status', 'sport'],
+        'sport_column': 'a.sport',
+        'key': 'a.athlete_id',
+    },
+    'mentorship': {
+        'from': 'mentorship m JOIN athletes a ON a.athlete_id = m.athlete_id',
+        'alias': 'm',
+        'columns': ['athlete_id', 'mentor_name', 'consultation_frequency_per_month',
+                    'mentee_progress_rating_1_10', 'mentee_feedback'],
+        'fts_key': 'm.athlete_id',
+        'fts_columns': ['a.full_name', 'm.athlete_id'],
+        'search': ['m.mentor_name'],
+        'filters': ['mentor_name', 'mentee_progress_rating_1_10'],
+        'sport_column': 'a.sport',
+        'key': 'm.mentorship_id',
+    },
+}
+
+def _qualify(spec, column):
+    return f"{spec['alias']}.{column}"
+
+def _paged_where(spec, sport, search, filters):
+    clauses, params = [], []
+    if sport is not None:
+        clauses.append(f"{spec['sport_column']} = ?")
+        params.append(sport)
+    if search:
+        alternatives, scanned = [], spec['search']
+        if _has_fts():
+            match = _fts_query(search.strip())
+            if match:
+                alternatives.append(f"{spec['fts_key']} IN "
+                                    "(SELECT athlete_id FROM athletes_fts WHERE athletes_fts MATCH ?)")
+                params.append(match)
+        else:
+            scanned = spec['fts_columns'] + scanned
+        pattern = '%' + (search.strip().casefold()
+                         .replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')) + '%'
+        alternatives += [f"casefold({column}) LIKE ? ESCAPE '\\'" for column in scanned]
+        params.extend([pattern] * len(scanned))
+        clauses.append('(' + ' OR '.join(alternatives) + ')')
+    for column, value in (filters or {}).items():
+        if column not in spec['filters']:
+            raise ValueError(f'Фильтр по столбцу {column} не поддерживается')
+        clauses.append(f'{_qualify(spec, column)} = ?')
+        params.append(value)
+    where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+    return where, params
+
+def paged_count(name, sport=None, search='', filters=None):
+    """Число строк, подходящих под поиск и фильтры"""
+    spec = PAGED_QUERIES[name]
+    where, params = _paged_where(spec, sport, search, filters)
+    return db.fetch_one(f"SELECT COUNT(*) FROM {spec['from']} {where}", params)[0]
+
+def paged_rows(name, sport=None, search='', filters=None, sort_by=None,
+               descending=False, limit=50, offset=0):
+    """Одна страница строк (LIMIT/OFFSET) с сортировкой на стороне SQL"""
+    spec = PAGED_QUERIES[name]
+    sort_by = sort_by or spec['columns'][0]
+    if sort_by not in spec['columns']:
+        raise ValueError(f'Сортировка по столбцу {sort_by} не поддерживается')
+    where, params = _paged_where(spec, sport, search, filters)
+    direction = 'DESC' if descending else 'ASC'
+    columns = ', '.join(_qualify(spec, column) for column in spec['columns'])
+    return db.read_sql(f'''
+        SELECT {columns} FROM {spec['from']}
+        {where}
+        ORDER BY {_qualify(spec, sort_by)} {direction}, {spec['key']} {direction}
+        LIMIT ? OFFSET ?''', (*params, int(limit), int(offset)))
+
+def distinct_values(name, column, sport=None):
+    """Различные значения столбца для выпадающего списка фильтра"""
+    spec = PAGED_QUERIES[name]
+    if column not in spec['filters']:
+        raise ValueError(f'Фильтр по столбцу {column} не поддерживается')
+    where, params = _paged_where(spec, sport, '', None)
+    qualified = _qualify(spec, column)
+    rows = db.fetch_all(f'''
+        SELECT DISTINCT {qualified} FROM {spec['from']}
+        {where}
+        ORDER BY {qualified}''', params)
+    return [row[0] for row in rows if row[0] is not None]
+
+# ===== ПОИСК СПОРТСМЕНА =====
+
+def _has_fts():
+    return db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'athletes_fts'") is not None
+
+def _fts_query(term):
+    """Строка поиска -> выражение MATCH: все слова как префиксы"""
+    words = term.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_athletes(term='', sport=None, limit=50):
+    """Первые limit спортсменов, подходящих под строку поиска (ФИО или ID).
+
+    Использует индекс FTS5 athletes_fts, а без него - LIKE по ФИО и ID.
+    Пустая строка (или строка из одних кавычек) - первые спортсмены по алфавиту.
+    """
+    term = (term or '').strip()
+    match = _fts_query(term)
+    sport_clause = 'AND a.sport = ?' if sport is not None else ''
+    sport_params = (sport,) if sport is not None else ()
+
+    if not match:
+        return db.read_sql(f'''
+            SELECT a.athlete_id, a.full_name, a.sport FROM athletes a
+            WHERE 1 = 1 {sport_clause}
+            ORDER BY a.full_name
+            LIMIT ?''', (*sport_params, int(limit)))
+
+    if _has_fts():
+        return db.read_sql(f'''
+            SELECT a.athlete_id, a.full_name, a.sport
+            FROM athletes_fts f
+            JOIN athletes a ON a.athlete_id = f.athlete_id
+            WHERE athletes_fts MATCH ? {sport_clause}
+            ORDER BY f.rank
+            LIMIT ?''', (match, *sport_params, int(limit)))
+
+    return paged_rows('athletes', sport, term, sort_by='full_name', limit=limit)[
+        ['athlete_id', 'full_name', 'sport']]
@@ -0,0 +1,290 @@
+# Olympic Reserve - Спортивные паспорта (PDF)
+# Отрисовка паспорта спортсмена и пакетная выгрузка в ZIP.
+# Запуск из командной строки:
+#   python reports.py --sport Гребля --out passports.zip
+#   python reports.py --reserve-level "Основной пул" --workers 8 --out pool.zip
+#   python reports.py --ids ROWINGM001 ROWINGM002 --out two.zip
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import string
+import sys
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+import db
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_THRESHOLD = 20   # меньшие пакеты рисуются в текущем процессе
+TASKS_PER_WORKER = 4      # паспортов "в полете" на процесс (ограничивает память)
+# Больше паспортов дашборд не формирует: ZIP целиком отдается кнопке скачивания
+# (около 45 КБ на PDF со встроенным шрифтом); большие выгрузки - через main()
+UI_EXPORT_LIMIT = int(os.environ.get('OLYMPIC_RESERVE_UI_EXPORT_LIMIT', '500'))
+
+# ===== ШРИФТЫ =====
+
+# Встроенный Helvetica не содержит кириллицы, поэтому используется TTF-шрифт.
+# Путь можно задать через OLYMPIC_RESERVE_FONT / OLYMPIC_RESERVE_FONT_BOLD;
+# на Streamlit Cloud DejaVu устанавливается из packages.txt.
+FONT_CANDIDATES = [
+    os.environ.get('OLYMPIC_RESERVE_FONT'),
+    os.path.join(db.BASE_DIR, 'fonts', 'DejaVuSans.ttf'),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+]
+BOLD_FONT_CANDIDATES = [
+    os.environ.get('OLYMPIC_RESERVE_FONT_BOLD'),
+    os.path.join(db.BASE_DIR, 'fonts', 'DejaVuSans-Bold.ttf'),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+    'C:\\Windows\\Fonts\\arialbd.ttf',
+]
+
+_fonts = None
+
+def _first_existing(paths):
+    return next((path for path in paths if path and os.path.exists(path)), None)
+
+def register_fonts():
+    """Зарегистрировать Unicode-шрифт один раз на процесс. Возвращает (обычный, жирный)"""
+    global _fonts
+    if _fonts is not None:
+        return _fonts
+
+    regular = _first_existing(FONT_CANDIDATES)
+    if regular is None:
+        logger.warning('TTF-шрифт с кириллицей не найден, используется Helvetica')
+        _fonts = ('Helvetica', 'Helvetica-Bold')
+        return _fonts
+
+    pdfmetrics.registerFont(TTFont('PassportSans', regular))
+    bold = _first_existing(BOLD_FONT_CANDIDATES)
+    if bold is not None:
+        pdfmetrics.registerFont(TTFont('PassportSans-Bold', bold))
+        _fonts = ('PassportSans', 'PassportSans-Bold')
+    else:
+        _fonts = ('PassportSans', 'PassportSans')
+    return _fonts
+
+# ===== ШАБЛОН ПАСПОРТА =====
+
+# Разделы: (заголовок, источник строки, [(подпись, формат значения)]).
+# Заголовок и формат заполняются полями строки через str.format_map;
+# значение с незаполненным полем выводится как MISSING.
+MISSING = '—'
+PASSPORT_TEMPLATE = [
+    (None, 'athlete', [
+        ('Спортсмен', '{full_name}'),
+        ('Вид спорта', '{sport}'),
+        ('Возраст', '{age} лет'),
+        ('Пол', '{gender}'),
+        ('Федерация', '{federation}'),
+    ]),
+    ('ФИЗИЧЕСКИЕ ПОКАЗАТЕЛИ', 'athlete', [
+        ('VO₂max', '{vo2_max_ml_kg_min} мл·кг⁻¹·мин⁻¹'),
+        ('Рост', '{height_cm} см'),
+        ('Вес', '{weight_kg} кг'),
+        ('Жировая ткань', '{body_fat_percent}%'),
+        ('Мышечная масса', '{muscle_mass_percent}%'),
+    ]),
+    ('МЕДИЦИНСКИЙ ОСМОТР ({exam_date})', 'medical', [
+        ('АД', '{systolic_blood_pressure}/{diastolic_blood_pressure}'),
+        ('Гемоглобин', '{hemoglobin_g_dl} г/дл'),
+        ('Статус', '{health_status}'),
+        ('Допуск', '{medical_clearance}'),
+    ]),
+    ('ПСИХОЛОГИЧЕСКИЙ ПРОФИЛЬ ({assessment_date})', 'psych', [
+        ('Мотивация', '{motivation_level_1_10}/10'),
+        ('Стрессоустойчивость', '{stress_resilience_1_10}/10'),
+        ('Общий балл', '{overall_psychological_score_1_100}/100'),
+    ]),
+]
+
+# Увеличить при изменении шаблона или отрисовки, чтобы сбросить кэш PDF
+TEMPLATE_VERSION = 3
+
+def passport_hash(athlete, medical=None, psych=None):
+    """Хэш содержимого паспорта: меняется только при изменении строк спортсмена"""
+    content = json.dumps([TEMPLATE_VERSION, register_fonts(), athlete, medical, psych],
+                         sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+# ===== ОТРИСОВКА =====
+
+def _is_missing(value):
+    return value is None or value != value  # NaN не равен самому себе
+
+def _fill(template, row, partial=False):
+    """Подставить поля строки вместо "None" для пропусков (NULL, NaN).
+
+    Значение с пропуском целиком заменяется на MISSING ("—", а не "— лет");
+    partial=True (заголовки разделов) - MISSING только на месте поля.
+    """
+    fields = [name for _, name, _, _ in string.Formatter().parse(template) if name]
+    missing = [name for name in fields if _is_missing(row.get(name))]
+    if not missing:
+        return template.format_map(row)
+    if not partial:
+        return MISSING
+    return template.format_map({**row, **dict.fromkeys(missing, MISSING)})
+
+def render_passport(athlete, medical=None, psych=None):
+    """PDF паспорта спортсмена (bytes) по строкам athletes, medical_records, psychological_records"""
+    regular, bold = register_fonts()
+    rows = {'athlete': athlete, 'medical': medical, 'psych': psych}
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    # Заголовок
+    p.setFont(bold, 16)
+    p.drawString(50, height - 50, "СПОРТИВНЫЙ ПАСПОРТ")
+    y = height - 80
+
+    for title, source, fields in PASSPORT_TEMPLATE:
+        row = rows[source]
+        if not row:
+            continue
+        if title:
+            y -= 20
+            p.setFont(bold, 12)
+            p.drawString(50, y, _fill(title, row, partial=True))
+            y -= 30
+        p.setFont(regular, 10 if title else 11)
+        for label, value in fields:
+            p.drawString(50, y, f"{label}: {_fill(value, row)}")
+            y -= 20
+
+    p.showPage()
+    p.save()
+
+    return buffer.getvalue()
+
+def _render_job(payload):
+    """Задача для процесса-исполнителя: (имя файла, PDF)"""
+    athlete, medical, psych = payload
+    return f"{athlete['athlete_id']}.pdf", render_passport(athlete, medical, psych)
+
+# ===== ДАННЫЕ ДЛЯ ПАКЕТА =====
+
+def select_athlete_ids(sport=None, reserve_levels=None, db_path=None):
+    """ID спортсменов по виду спорта и уровням резерва"""
+    clauses, params = [], []
+    if sport is not None:
+        clauses.append('sport = ?')
+        params.append(sport)
+    if reserve_levels:
+        clauses.append('reserve_level IN (SELECT value FROM json_each(?))')
+        params.append(json.dumps(list(reserve_levels), ensure_ascii=False))
+    where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+    rows = db.fetch_all(f'SELECT athlete_id FROM athletes {where} ORDER BY athlete_id',
+                        params, db_path=db_path)
+    return [row[0] for row in rows]
+
+def fetch_passport_data(athlete_ids, db_path=None):
+    """Строки для паспортов: один запрос на таблицу для всего пакета.
+
+    Список ID передается одним параметром JSON (json_each), поэтому
+    размер пакета не ограничен числом параметров SQLite.
+    Возвращает [(athlete, latest_medical, latest_psych)] в порядке athlete_ids.
+    """
+    ids = json.dumps(list(athlete_ids))
+    athletes = {row['athlete_id']: dict(row) for row in db.fetch_all(
+        'SELECT * FROM athletes WHERE athlete_id IN (SELECT value FROM json_each(?))',
+        (ids,), db_path=db_path)}
+    medical = {row['athlete_id']: dict(row) for row in db.fetch_all('''
+        SELECT * FROM (
+            SELECT m.*, ROW_NUMBER() OVER (
+                PARTITION BY athlete_id ORDER BY exam_date DESC, medical_record_id DESC) AS rn
+            FROM medical_records m
+            WHERE athlete_id IN (SELECT value FROM json_each(?))
+        ) WHERE rn = 1''', (ids,), db_path=db_path)}
+    psych = {row['athlete_id']: dict(row) for row in db.fetch_all('''
+        SELECT * FROM (
+            SELECT p.*, ROW_NUMBER() OVER (
+                PARTITION BY athlete_id ORDER BY assessment_date DESC, psych_record_id DESC) AS rn
+            FROM psychological_records p
+            WHERE athlete_id IN (SELECT value FROM json_each(?))
+        ) WHERE rn = 1''', (ids,), db_path=db_path)}
+    return [(athletes[i], medical.get(i), psych.get(i)) for i in athlete_ids if i in athletes]
+
+# ===== ПАКЕТНАЯ ВЫГРУЗКА =====
+
+def _render_parallel(payloads, workers):
+    """Рисовать паспорта в пуле процессов, выдавая результаты по готовности.
+
+    Одновременно в работе не больше workers * TASKS_PER_WORKER паспортов,
+    поэтому готовые PDF не накапливаются в памяти.
+    """
+    # spawn: fork из многопоточного сервера Streamlit может привести к взаимоблокировке
+    context = multiprocessing.get_context('spawn')
+    payloads = iter(payloads)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = set()
+        for payload in payloads:
+            pending.add(executor.submit(_render_job, payload))
+            if len(pending) >= workers * TASKS_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+def export_passports_zip(athlete_ids, output, workers=None, db_path=None):
+    """Записать паспорта спортсменов в ZIP-архив.
+
+    output - путь или файловый объект (в том числе без seek).
+    Возвращает число паспортов в архиве.
+    """
+    payloads = fetch_passport_data(athlete_ids, db_path=db_path)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(payloads) >= PARALLEL_THRESHOLD:
+        results = _render_parallel(payloads, workers)
+    else:
+        results = map(_render_job, payloads)
+
+    count = 0
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in results:
+            archive.writestr(filename, pdf)
+            count += 1
+    return count
+
+# ===== КОМАНДНАЯ СТРОКА =====
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетная выгрузка спортивных паспортов в ZIP')
+    parser.add_argument('--db', default=db.DB_NAME, help='путь к файлу SQLite')
+    parser.add_argument('--sport', help='вид спорта')
+    parser.add_argument('--reserve-level', action='append', dest='reserve_levels',
+                        help='уровень резерва (можно указать несколько раз)')
+    parser.add_argument('--ids', nargs='+', help='ID спортсменов')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию - все ядра)')
+    parser.add_argument('--out', required=True, help='путь к ZIP-архиву')
+    args = parser.parse_args(argv)
+
+    athlete_ids = args.ids or select_athlete_ids(args.sport, args.reserve_levels, db_path=args.db)
+    if not athlete_ids:
+        print('⚠️ Спортсмены не найдены')
+        return 1
+
+    count = export_passports_zip(athlete_ids, args.out, workers=args.workers, db_path=args.db)
+    print(f'✅ Паспортов в архиве: {count} → {args.out}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# Olympic Reserve - Колоночный снимок данных (Parquet + Arrow IPC)
+# Выгружает все таблицы БД из одной транзакции чтения:
+# - parquet/<таблица>/sport=.../year=.../ - для аналитиков (pandas, DuckDB,
+#   Spark читают только нужные виды спорта и годы);
+# - arrow/<таблица>.arrow - несжатый Arrow IPC, который приложение отображает
+#   в память при старте вместо чтения из SQLite. Страницы файла общие для всех
+#   процессов Streamlit на сервере (кэш страниц ОС).
+# Таблицы пишутся уже в компактных типах frames.compact (категории -
+# словарные столбцы Arrow, даты - timestamp), поэтому to_pandas при загрузке
+# не преобразует типы, а DataFrame ссылается на буферы файла.
+# Строки в Arrow IPC отсортированы по виду спорта: выборка куратора - срез
+# без копирования. manifest.json хранит версии таблиц (table_versions) на
+# момент выгрузки; таблица, измененная после выгрузки, снова читается из БД.
+# Срезы дочерних таблиц по виду спорта построены по athletes.sport, поэтому
+# после изменения athletes выборки кураторов тоже читаются из БД.
+# Запуск из командной строки:
+#   python snapshot.py                      # снимок в snapshot/ рядом с БД
+#   python snapshot.py --out /data/snapshot --no-parquet
+#   python snapshot.py --status             # какие таблицы снимка актуальны
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+import db
+import frames
+import migrations
+import queries
+
+SNAPSHOT_DIR = os.environ.get('OLYMPIC_RESERVE_SNAPSHOT', os.path.join(db.BASE_DIR, 'snapshot'))
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 2         # 2 - компактные типы в Arrow IPC
+
+# Дата, по году которой разбивается Parquet (у наставников даты нет)
+PARTITION_DATES = {
+    'athletes': 'enrollment_date',
+    'medical_records': 'exam_date',
+    'functional_tests': 'test_date',
+    'psychological_records': 'assessment_date',
+    'financial_records': 'record_date',
+    'mentorship': 'program_start_date',
+    'training_camps': 'start_date',
+}
+SPORT_COLUMN = '_sport'    # вид спорта спортсмена для дочерних таблиц
+
+# ===== ВЫГРУЗКА =====
+
+def _select(table):
+    """Строки таблицы с видом спорта, упорядоченные по виду спорта и ключу"""
+    key = migrations.PRIMARY_KEYS[table]
+    if table in queries.SPORT_TABLES:
+        return f'SELECT *, sport AS {SPORT_COLUMN} FROM {table} ORDER BY sport, {key}'
+    # LEFT JOIN: строки без спортсмена попадают в снимок, но не в срезы кураторов
+    return f'''
+        SELECT t.*, a.sport AS {SPORT_COLUMN} FROM {table} t
+        LEFT JOIN athletes a ON a.athlete_id = t.athlete_id
+        ORDER BY a.sport, t.{key}'''
+
+def _to_arrow(df):
+    """DataFrame -> pa.Table; столбцы со смешанными типами (SQLite) -> строки"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for column in df.columns:
+            try:
+                pa.array(df[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                df[column] = df[column].map(lambda v: None if pd.isna(v) else str(v))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+def _sport_ranges(sports):
+    """[[вид спорта, начало, число строк], ...] для отсортированного столбца"""
+    return [[sport, int(idx[0]), len(idx)]
+            for sport, idx in sports.groupby(sports, sort=False).indices.items()]
+
+def _write_ipc(table, path):
+    with pa.OSFile(path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def _write_parquet(df, table, directory):
+    """Parquet с разбиением по виду спорта и году (hive: sport=.../year=...)"""
+    df = df.drop(columns='sport', errors='ignore').rename(columns={SPORT_COLUMN: 'sport'})
+    partition_cols = ['sport']
+    date_column = PARTITION_DATES.get(table)
+    if date_column:
+        df['year'] = pd.to_datetime(df[date_column], errors='coerce').dt.year.astype('Int16')
+        partition_cols.append('year')
+    # Без метаданных pandas: иначе тип year из метаданных (Int16) спорит с
+    # типом, который читатель выводит из имен каталогов
+    pq.write_to_dataset(_to_arrow(df).replace_schema_metadata(None),
+                        os.path.join(directory, table), partition_cols=partition_cols)
+
+def export(out_dir=None, db_path=None, parquet=True):
+    """Выгрузить снимок всех таблиц и вернуть манифест.
+
+    Все таблицы и их версии читаются в одной транзакции, поэтому снимок
+    согласован. Новый снимок пишется во временный каталог и заменяет
+    старый целиком; уже отображенные в память файлы остаются доступны
+    процессам до их закрытия.
+    """
+    out_dir = os.path.abspath(out_dir or SNAPSHOT_DIR)
+    db_path = db_path or db.DB_NAME
+    tmp_dir = f'{out_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, 'arrow'))
+
+    manifest = {'format': FORMAT_VERSION, 'created_at': time.time(),
+                'db_path': os.path.abspath(db_path), 'versions': {}, 'tables': {}}
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+    try:
+        conn.execute('BEGIN')
+        try:
+            manifest['versions'] = dict(conn.execute(
+                'SELECT table_name, version FROM table_versions').fetchall())
+        except sqlite3.OperationalError:
+            pass  # БД без миграций: версии 0, как в app.table_versions
+        for table in db.TABLES:
+            df = frames.compact(pd.read_sql(_select(table), conn), table)
+            manifest['tables'][table] = {
+                'rows': len(df),
+                'sports': _sport_ranges(df[SPORT_COLUMN]),
+            }
+            _write_ipc(_to_arrow(df.drop(columns=SPORT_COLUMN)),
+                       os.path.join(tmp_dir, 'arrow', f'{table}.arrow'))
+            if parquet:
+                _write_parquet(df, table, os.path.join(tmp_dir, 'parquet'))
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+    with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old_dir = f'{out_dir}.old-{os.getpid()}'
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+# ===== ЗАГРУЗКА =====
+
+def manifest_mtime(directory=None):
+    """Время изменения манифеста или None, если снимка нет"""
+    try:
+        return os.stat(os.path.join(directory or SNAPSHOT_DIR, MANIFEST)).st_mtime_ns
+    except OSError:
+        return None
+
+class Snapshot:
+    """Таблицы Arrow IPC снимка, отображенные в память.
+
+    Буферы таблиц ссылаются на страницы файлов (без чтения в память
+    процесса); числовые столбцы без пропусков и строки pandas получает
+    без копирования.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or SNAPSHOT_DIR
+        with open(os.path.join(self.directory, MANIFEST), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f'Неподдерживаемый формат снимка: {self.manifest.get("format")}')
+        self.versions = self.manifest['versions']
+        self._tables = {}
+        self._ranges = {}
+        for table, info in self.manifest['tables'].items():
+            source = pa.memory_map(os.path.join(self.directory, 'arrow', f'{table}.arrow'), 'r')
+            self._tables[table] = ipc.open_file(source).read_all()
+            self._ranges[table] = {sport: (start, length) for sport, start, length in info['sports']}
+
+    def covers(self, table, version, athletes_version=None):
+        """Есть ли в снимке таблица той же версии, что и в БД.
+
+        athletes_version задается для выборки дочерней таблицы по виду
+        спорта: ее срезы действительны, только пока не менялась athletes.
+        """
+        if table not in self._tables or self.versions.get(table, 0) != version:
+            return False
+        return athletes_version is None or self.versions.get('athletes', 0) == athletes_version
+
+    def stale_tables(self, versions):
+        """Таблицы, измененные в БД после выгрузки снимка"""
+        return [table for table in self._tables if not self.covers(table, versions.get(table, 0))]
+
+    def stale_slices(self, versions):
+        """Таблицы, у которых устарели только срезы по виду спорта (изменилась athletes)"""
+        athletes_version = versions.get('athletes', 0)
+        return [table for table in self._tables
+                if table not in queries.SPORT_TABLES
+                and self.covers(table, versions.get(table, 0))
+                and not self.covers(table, versions.get(table, 0), athletes_version)]
+
+    def table(self, table, sport=None):
+        """pa.Table целиком или срез строк вида спорта (без копирования)"""
+        arrow_table = self._tables[table]
+        if sport is None:
+            return arrow_table
+        start, length = self._ranges[table].get(sport, (0, 0))
+        return arrow_table.slice(start, length)
+
+    def read(self, table, sport=None):
+        """Таблица как DataFrame - замена queries.scoped_table"""
+        return self.table(table, sport).to_pandas(split_blocks=True)
+
+    @property
+    def nbytes(self):
+        """Объем отображенных в память таблиц, байт"""
+        return sum(t.nbytes for t in self._tables.values())
+
+# ===== ЗАПУСК ИЗ КОМАНДНОЙ СТРОКИ =====
+
+def _status(directory, db_path):
+    snapshot = Snapshot(directory)
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        versions = dict(conn.execute('SELECT table_name, version FROM table_versions').fetchall())
+    finally:
+        conn.close()
+    stale = set(snapshot.stale_tables(versions))
+    stale_slices = set(snapshot.stale_slices(versions))
+    created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.manifest['created_at']))
+    print(f'Снимок {directory} от {created}, {snapshot.nbytes / 2**20:.1f} МБ')
+    for table, info in snapshot.manifest['tables'].items():
+        state = ('устарел' if table in stale
+                 else 'устарели выборки по виду спорта (изменилась athletes)' if table in stale_slices
+                 else 'актуален')
+        print(f'  {table:<24}{info["rows"]:>10} строк  {state}')
+    return 1 if stale or stale_slices else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Колоночный снимок БД (Parquet + Arrow IPC)')
+    parser.add_argument('--db', default=None, help='файл БД (по умолчанию olympic_reserve.db)')
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help='каталог снимка')
+    parser.add_argument('--no-parquet', action='store_true',
+                        help='только Arrow IPC для приложения, без Parquet')
+    parser.add_argument('--status', action='store_true',
+                        help='проверить актуальность снимка (код 1, если есть устаревшие таблицы '
+                             'или выборки по виду спорта)')
+    args = parser.parse_args(argv)
+    db_path = args.db or db.DB_NAME
+
+    if args.status:
+        return _status(args.out, db_path)
+
+    start = time.perf_counter()
+    manifest = export(args.out, db_path, parquet=not args.no_parquet)
+    rows = sum(info['rows'] for info in manifest['tables'].values())
+    print(f'Снимок {args.out}: {len(manifest["tables"])} таблиц, {rows} строк '
+          f'за {time.perf_counter() - start:.1f} с')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())